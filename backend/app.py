@@ -1,12 +1,13 @@
 # app.py
-from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, Request, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from pydantic import BaseModel, Field, EmailStr
 import numpy as np
 from typing import List, Optional
 import logging
 import tempfile
-import soundfile as sf
 import librosa
 import traceback
 import time
@@ -14,6 +15,8 @@ import os
 import re
 import html
 import uuid
+import asyncio
+import orjson
 from datetime import datetime, timedelta, timezone
 from motor.motor_asyncio import AsyncIOMotorClient
 from fastapi.security import OAuth2PasswordBearer
@@ -24,19 +27,29 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 # Local imports
-from core.schemas.audio import AudioClipCreate, AudioClipInDB, YouTubeAudioRequest
+from core.schemas.audio import AudioClipCreate, AudioClipOut, YouTubeAudioRequest
 from core.schemas.user import UserCreate, UserLogin, UserInDB
 from core.security import hash_password, verify_password, create_access_token, decode_access_token
-from core.db.mongo import audio_clips_collection
 from core.routes.user import get_current_user, router as user_router
-from improved_inference import predict_emotion_improved
+from core.routes.admin import router as admin_router
+from core.config import settings
+from core.schemas.stats import EmotionStatsResponse
+from core.services.clip_service import (clip_writer, list_clips, find_clips_by_ids, find_embedding_version,
+                                       export_ndjson, export_zip)
+from core.services.audio_json import audio_body_openapi, read_audio_body
+from core.services.feature_cache import cache_clip_features, clip_features
+from core.services.pipeline import AudioDecodeError, PipelineStoppedError, build_prediction_pipeline
+from core.services.similarity_service import embedding_fields, embedding_indexes
+from core.services.stats_service import ensure_stats_indexes, get_emotion_stats
+from core.services.audio_service import load_audio_file, get_decode_pool, shutdown_decode_pool
+from improved_inference import predict_emotion_improved, registry, cascade, DURATION
 
 limiter = Limiter(key_func=get_remote_address)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Voice Emotion Detection API", version="1.0.0")
+app = FastAPI(title="Voice Emotion Detection API", version="1.0.0", default_response_class=ORJSONResponse)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -56,7 +69,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Clip listings carry raw samples and compress well
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=1)
+
 app.include_router(user_router)
+app.include_router(admin_router)
+
+prediction_pipeline = build_prediction_pipeline()
+
+@app.on_event("startup")
+async def on_startup():
+    prediction_pipeline.start()
+    clip_writer.start()
+    await ensure_stats_indexes()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await prediction_pipeline.stop()
+    await clip_writer.stop()
+    clip_features.flush()
+    shutdown_decode_pool()
 
 class AudioRequest(BaseModel):
     audio_data: List[float]
@@ -65,6 +97,8 @@ class EmotionResponse(BaseModel):
     emotion: str
     confidence: Optional[float] = None
     processing_time: Optional[float] = None
+    model_version: Optional[str] = None
+    stage: Optional[str] = None
 
 class AudioSaveRequest(BaseModel):
     audio_data: List[float]
@@ -74,28 +108,51 @@ class AudioSaveRequest(BaseModel):
 
 # JWT config - using core.security functions instead
 
+def prediction_fields(prediction) -> dict:
+    """Response fields describing which model answered and how sure it was."""
+    if prediction is None:
+        return {"confidence": None, "model_version": None, "stage": None}
+    return {"confidence": prediction.confidence, "model_version": prediction.model_version,
+            "stage": prediction.stage}
+
+def pipeline_unavailable(error: Exception) -> HTTPException:
+    """503 for a clip the pipeline couldn't take or finish in time, instead of a made-up label."""
+    if isinstance(error, asyncio.TimeoutError):
+        detail = f"Prediction timed out after {prediction_pipeline.timeout:g}s; the server is overloaded"
+    else:
+        detail = "Prediction pipeline is not running"
+    logger.warning(f"Prediction unavailable: {detail}")
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
 @app.get("/")
 async def root():
     return {"message": "Voice Emotion Detection API is running"}
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": True}
+    return {
+        "status": "healthy",
+        "model_loaded": True,
+        "model_version": registry.active.version,
+        "shadow_model_version": registry.shadow.version if registry.shadow else None,
+        "cascade_version": cascade.version if cascade else None,
+    }
+
+@app.get("/pipeline-stats")
+async def get_pipeline_stats():
+    """Per-stage queue depth, utilization and backpressure of the prediction pipeline"""
+    return prediction_pipeline.stats()
 
-@app.post("/predict-emotion", response_model=EmotionResponse)
-async def predict_emotion(request: AudioRequest):
+@app.post("/predict-emotion", response_model=EmotionResponse, openapi_extra=audio_body_openapi(AudioRequest))
+async def predict_emotion(request: Request):
+    # The body is parsed straight into a float32 array (see core/services/audio_json.py)
+    audio_array, _ = await read_audio_body(request, AudioRequest)
     try:
         # Validate input
-        if not request.audio_data:
+        if len(audio_array) == 0:
             raise HTTPException(status_code=400, detail="Audio data is required")
         
-        if len(request.audio_data) == 0:
-            raise HTTPException(status_code=400, detail="Audio data cannot be empty")
-        
-        logger.info(f"Received audio data with {len(request.audio_data)} samples")
-        
-        # Convert to numpy array
-        audio_array = np.array(request.audio_data, dtype=np.float32)
+        logger.info(f"Received audio data with {len(audio_array)} samples")
         
         # Validate audio array
         if np.isnan(audio_array).any():
@@ -122,9 +179,13 @@ async def predict_emotion(request: AudioRequest):
         
         # Use your existing prediction function
         start_time = time.time()
+        prediction = None
         
         try:
-            predicted_emotion = predict_emotion_improved(audio_array)
+            prediction = await prediction_pipeline.submit(audio_array)
+            predicted_emotion = prediction.emotion
+        except (asyncio.TimeoutError, PipelineStoppedError) as e:
+            raise pipeline_unavailable(e)
         except Exception as e:
             logger.error(f"Error in prediction model: {str(e)}")
             logger.error(traceback.format_exc())
@@ -137,7 +198,8 @@ async def predict_emotion(request: AudioRequest):
         
         return EmotionResponse(
             emotion=predicted_emotion,
-            processing_time=processing_time
+            processing_time=processing_time,
+            **prediction_fields(prediction)
         )
         
     except HTTPException:
@@ -151,45 +213,39 @@ async def predict_emotion(request: AudioRequest):
 async def predict_emotion_batch(requests: List[AudioRequest]):
     """Batch prediction endpoint for multiple audio samples"""
     try:
-        results = []
+        results = [None] * len(requests)
+        jobs = {}
         for i, request in enumerate(requests):
-            try:
-                # Validate and process audio
-                audio_array = np.array(request.audio_data, dtype=np.float32)
-                
-                # Basic validation
-                if len(audio_array) == 0:
-                    results.append({
-                        "index": i,
-                        "emotion": "neutral",
-                        "success": True,
-                        "warning": "Empty audio data"
-                    })
-                    continue
-                
-                # Clean audio data
-                audio_array = np.nan_to_num(audio_array)
-                audio_array = np.clip(audio_array, -1.0, 1.0)
-                
-                # Normalize if needed
-                max_val = np.max(np.abs(audio_array))
-                if max_val > 1.0:
-                    audio_array = audio_array / max_val
-                
-                predicted_emotion = predict_emotion_improved(audio_array)
-                results.append({
+            # Basic validation
+            if len(request.audio_data) == 0:
+                results[i] = {
                     "index": i,
-                    "emotion": predicted_emotion,
-                    "success": True
-                })
-            except Exception as e:
-                logger.error(f"Error processing audio sample {i}: {str(e)}")
-                results.append({
+                    "emotion": "neutral",
+                    "success": True,
+                    "warning": "Empty audio data"
+                }
+                continue
+            # Cleaning happens in the pipeline's decode stage; queued clips
+            # share model batches
+            jobs[i] = prediction_pipeline.submit(request.audio_data)
+
+        outcomes = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        for i, outcome in zip(jobs, outcomes):
+            if isinstance(outcome, Exception):
+                logger.error(f"Error processing audio sample {i}: {str(outcome)}")
+                results[i] = {
                     "index": i,
                     "emotion": "neutral",
                     "success": False,
-                    "error": str(e)
-                })
+                    "error": str(outcome)
+                }
+            else:
+                results[i] = {
+                    "index": i,
+                    "emotion": outcome.emotion,
+                    **prediction_fields(outcome),
+                    "success": True
+                }
         
         return {"results": results}
         
@@ -201,6 +257,7 @@ async def predict_emotion_batch(requests: List[AudioRequest]):
 async def predict_emotion_file(file: UploadFile = File(...)):
     if not file.content_type.startswith("audio/"):
         raise HTTPException(status_code=400, detail="Invalid file type. Please upload an audio file.")
+    tmp_path = None
     try:
         # Validate file
         if not file.filename:
@@ -215,39 +272,18 @@ async def predict_emotion_file(file: UploadFile = File(...)):
             tmp.write(contents)
             tmp_path = tmp.name
 
-        # Try to load audio using librosa (handles most formats)
-        try:
-            audio, sr = librosa.load(tmp_path, sr=22050, mono=True)
-        except Exception as e:
-            logger.error(f"Error loading audio with librosa: {str(e)}")
-            try:
-                # Try with soundfile as fallback
-                audio, sr = sf.read(tmp_path)
-                if sr != 22050:
-                    audio = librosa.resample(audio, orig_sr=sr, target_sr=22050)
-                    sr = 22050
-                if audio.ndim > 1:
-                    audio = audio[:, 0]  # Take first channel if stereo
-            except Exception as e2:
-                logger.error(f"Error loading audio with soundfile: {str(e2)}")
-                raise HTTPException(status_code=400, detail="Unable to decode audio file")
-
-        # Validate loaded audio
-        if len(audio) == 0:
-            raise HTTPException(status_code=400, detail="Audio file appears to be empty")
-        
-        # Clean and normalize audio
-        audio = np.nan_to_num(audio)
-        audio = np.clip(audio, -1.0, 1.0)
-        
-        max_val = np.max(np.abs(audio))
-        if max_val > 1.0:
-            audio = audio / max_val
-
-        # Use your existing prediction function
+        # Decoding (librosa with soundfile fallback), features and the model
+        # run as separate pipeline stages
         start_time = time.time()
+        prediction = None
         try:
-            predicted_emotion = predict_emotion_improved(audio)
+            prediction = await prediction_pipeline.submit(tmp_path)
+            predicted_emotion = prediction.emotion
+        except AudioDecodeError as e:
+            logger.error(f"Error decoding uploaded audio: {str(e)}")
+            raise HTTPException(status_code=400, detail="Unable to decode audio file")
+        except (asyncio.TimeoutError, PipelineStoppedError) as e:
+            raise pipeline_unavailable(e)
         except Exception as e:
             logger.error(f"Error in prediction: {str(e)}")
             predicted_emotion = "neutral"
@@ -256,7 +292,8 @@ async def predict_emotion_file(file: UploadFile = File(...)):
 
         return EmotionResponse(
             emotion=predicted_emotion,
-            processing_time=processing_time
+            processing_time=processing_time,
+            **prediction_fields(prediction)
         )
         
     except HTTPException:
@@ -265,13 +302,99 @@ async def predict_emotion_file(file: UploadFile = File(...)):
         logger.error(f"Error processing uploaded audio: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error processing uploaded audio: {str(e)}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError as cleanup_err:
+                logger.warning(f"Failed to cleanup temp file {tmp_path}: {cleanup_err}")
+
+@app.post("/predict-emotion-files")
+async def predict_emotion_files(files: List[UploadFile] = File(...)):
+    """Batch prediction for many uploaded files, streamed back as NDJSON.
+
+    Files are decoded in a process pool and scored through the prediction
+    pipeline, whose model stage batches them with other requests; one JSON
+    line is written per file as soon as it is scored, so results arrive out
+    of upload order (use ``index`` to match them up).
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    if len(files) > settings.MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files (max {settings.MAX_BATCH_FILES})")
+
+    # Spool uploads to disk before returning: the upload handles are closed
+    # once the handler exits, and workers decode by path.
+    jobs = []
+    rejected = []
+    for i, file in enumerate(files):
+        if not file.content_type or not file.content_type.startswith("audio/"):
+            rejected.append({"index": i, "filename": file.filename, "emotion": "neutral",
+                             "success": False, "error": "Invalid file type"})
+            continue
+        contents = await file.read()
+        if len(contents) == 0:
+            rejected.append({"index": i, "filename": file.filename, "emotion": "neutral",
+                             "success": False, "error": "Empty file"})
+            continue
+        suffix = os.path.splitext(file.filename or "")[1] or ".webm"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+            tmp.write(contents)
+            jobs.append((i, file.filename, tmp.name))
+
+    async def score_file(i: int, filename: str, path: str) -> dict:
+        try:
+            audio = await asyncio.wrap_future(get_decode_pool().submit(load_audio_file, path, duration=DURATION))
+        except Exception as e:
+            logger.error(f"Error decoding file {i} ({filename}): {str(e)}")
+            return {"index": i, "filename": filename, "emotion": "neutral",
+                    "success": False, "error": "Unable to decode audio file"}
+
+        # Decoded clips share the pipeline's model batches and backpressure
+        # with every other prediction route
+        start_time = time.time()
+        prediction = None
+        error = None
+        try:
+            prediction = await prediction_pipeline.submit(audio)
+        except (asyncio.TimeoutError, PipelineStoppedError) as e:
+            error = pipeline_unavailable(e).detail
+        except Exception as e:
+            logger.error(f"Error predicting file {i} ({filename}): {str(e)}")
+            error = str(e)
+        result = {"index": i, "filename": filename,
+                  "emotion": prediction.emotion if prediction else "neutral",
+                  **prediction_fields(prediction),
+                  "success": error is None, "processing_time": time.time() - start_time}
+        if error:
+            result["error"] = error
+        return result
+
+    async def result_stream():
+        tasks = []
+        try:
+            for result in rejected:
+                yield orjson.dumps(result) + b"\n"
+            tasks = [asyncio.create_task(score_file(*job)) for job in jobs]
+            for task in asyncio.as_completed(tasks):
+                yield orjson.dumps(await task) + b"\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, _, path in jobs:
+                try:
+                    os.remove(path)
+                except OSError as cleanup_err:
+                    logger.warning(f"Failed to cleanup temp file {path}: {cleanup_err}")
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
 
 @app.get("/emotions")
 async def get_supported_emotions():
     """Get list of supported emotions"""
     try:
-        from improved_inference import EMOTIONS
-        return {"emotions": EMOTIONS}
+        return {"emotions": registry.active.emotions}
     except Exception as e:
         logger.error(f"Error getting emotions: {str(e)}")
         return {"emotions": ["neutral", "happy", "sad", "angry", "fearful", "surprised", "disgust", "calm"]}
@@ -418,8 +541,13 @@ async def predict_emotion_youtube(
         
         # Predict emotion
         start_time = time.time()
+        prediction = None
         try:
-            predicted_emotion = predict_emotion_improved(audio)
+            prediction = await prediction_pipeline.submit(audio, with_embedding=True)
+            predicted_emotion = prediction.emotion
+        except (asyncio.TimeoutError, PipelineStoppedError) as e:
+            # Don't store a clip labeled with a guess made under overload
+            raise pipeline_unavailable(e)
         except Exception as e:
             logger.error(f"Error in prediction: {str(e)}")
             predicted_emotion = "neutral"
@@ -434,13 +562,19 @@ async def predict_emotion_youtube(
             "timestamp": time.time(),
             "notes": html.escape(body.notes) if body.notes else None,
             "created_at": datetime.now(timezone.utc),
-            "youtube_url": body.youtube_url
+            "youtube_url": body.youtube_url,
+            "model_version": prediction.model_version if prediction else None,
+            "emotion_source": "model" if prediction else "fallback",
+            **embedding_fields(prediction)
         }
-        result = await audio_clips_collection.insert_one(audio_doc)
+        # Write-behind: the response doesn't carry the clip id
+        audio_id = await clip_writer.insert(audio_doc)
+        await cache_clip_features(audio_id, prediction.mel if prediction else None)
         
         return EmotionResponse(
             emotion=predicted_emotion,
-            processing_time=processing_time
+            processing_time=processing_time,
+            **prediction_fields(prediction)
         )
         
     except HTTPException:
@@ -469,61 +603,129 @@ async def predict_emotion_youtube(
         except Exception:
             pass
 
-@app.post("/save-audio")
-async def save_audio(request: AudioClipCreate, current_user: dict = Depends(get_current_user)):
-    if not request.audio_data or len(request.audio_data) == 0:
+@app.post("/save-audio", openapi_extra=audio_body_openapi(AudioClipCreate))
+async def save_audio(raw_request: Request, durable: bool = True, current_user: dict = Depends(get_current_user)):
+    # float64 so the stored samples round-trip exactly as the client sent them
+    audio_array, request = await read_audio_body(raw_request, AudioClipCreate, dtype=np.float64)
+    if len(audio_array) == 0:
         raise HTTPException(status_code=400, detail="Audio data required")
     
-    # Save audio as .npy file
-    
-    
-    # Predict emotion if not provided
+    # Always run the CNN so the clip gets an embedding for similarity search;
+    # its emotion is used only if the client didn't provide one
+    prediction = None
+    try:
+        prediction = await prediction_pipeline.submit(audio_array, with_embedding=True)
+    except (asyncio.TimeoutError, PipelineStoppedError) as e:
+        # A clip the client labeled can still be saved, just without an embedding
+        if not request.emotion:
+            raise pipeline_unavailable(e)
+        logger.warning(f"Saving labeled clip without an embedding: {str(e) or type(e).__name__}")
+    except Exception as e:
+        logger.error(f"Error in prediction: {str(e)}")
     emotion = request.emotion
+    model_version = None
+    emotion_source = "user"
     if not emotion:
-        audio_array = np.array(request.audio_data, dtype=np.float32)
-        try:
-            emotion = predict_emotion_improved(audio_array)
-        except Exception:
-            emotion = "neutral"
+        emotion = prediction.emotion if prediction else "neutral"
+        model_version = prediction.model_version if prediction else None
+        # Fallback labels get relabeled by rescore_clips.py, unlike the user's
+        emotion_source = "model" if prediction else "fallback"
     
     audio_doc = {
         "user_id": str(current_user.get("_id")),
         "email": current_user["email"],
-        "audio_data": request.audio_data,  # Store path instead of raw data
+        "audio_data": audio_array.tolist(),
         "emotion": emotion,
         "timestamp": request.timestamp or time.time(),
         "notes": html.escape(request.notes) if request.notes else None,
-        "created_at": datetime.now(timezone.utc)
+        "created_at": datetime.now(timezone.utc),
+        "model_version": model_version,
+        "emotion_source": emotion_source,
+        **embedding_fields(prediction)
     }
-    result = await audio_clips_collection.insert_one(audio_doc)
-    return {"msg": "Audio saved", "audio_id": str(result.inserted_id), "emotion": emotion}
+    # durable=false returns once the clip is buffered; the id is assigned
+    # up front either way
+    audio_id = await clip_writer.insert(audio_doc, durable=durable)
+    await cache_clip_features(audio_id, prediction.mel if prediction else None)
+    return {"msg": "Audio saved", "audio_id": str(audio_id), "emotion": emotion, "model_version": model_version,
+            "emotion_source": emotion_source}
 
-@app.get("/my-audio", response_model=List[AudioClipInDB])
+@app.get("/my-audio", response_model=List[AudioClipOut])
 async def get_my_audio(skip: int = 0,
-    limit: int = 20,current_user: dict = Depends(get_current_user)):
-    cursor = audio_clips_collection.find({"user_id": str(current_user.get("_id"))}).skip(skip).limit(limit)
-    audio_list = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
-        audio_list.append(AudioClipInDB(**doc))
-    return audio_list
-
-@app.get("/my-youtube-audio", response_model=List[AudioClipInDB])
+    limit: int = 20, include_audio: bool = True, current_user: dict = Depends(get_current_user)):
+    # Stored documents are trusted, so skip response_model re-validation
+    clips = await list_clips({"user_id": str(current_user.get("_id"))}, skip, limit, include_audio)
+    return ORJSONResponse(clips)
+
+@app.get("/my-audio/export")
+async def export_my_audio(
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Stream the user's full clip history as NDJSON or a zip of WAVs + metadata.csv."""
+    user_id = str(current_user.get("_id"))
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d")
+    if format == "zip":
+        return StreamingResponse(
+            export_zip(user_id),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="audio-export-{stamp}.zip"'},
+        )
+    return StreamingResponse(
+        export_ndjson(user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="audio-export-{stamp}.ndjson"'},
+    )
+
+@app.get("/my-audio/{audio_id}/similar")
+async def get_similar_audio(
+    audio_id: str,
+    k: int = Query(10, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """Nearest saved clips by cosine similarity of their stored CNN embeddings.
+
+    Clips are compared with those embedded by the same model version as the
+    query clip, so clips saved before a model swap keep working until
+    rescore_clips.py re-embeds them.
+    """
+    user_id = str(current_user.get("_id"))
+    version = await find_embedding_version(user_id, audio_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Clip not found or has no embedding")
+    index = await embedding_indexes.get(user_id, version)
+    neighbours = index.query(audio_id, k)
+    if neighbours is None:
+        raise HTTPException(status_code=404, detail="Clip not found or has no embedding")
+
+    scores = dict(neighbours)
+    clips = await find_clips_by_ids(user_id, list(scores))
+    results = [dict(clip, similarity=scores[clip["_id"]]) for clip in clips]
+    results.sort(key=lambda clip: clip["similarity"], reverse=True)
+    return ORJSONResponse({"audio_id": audio_id, "model_version": index.version,
+                           "active_model_version": registry.active.version, "results": results})
+
+@app.get("/my-youtube-audio", response_model=List[AudioClipOut])
 async def get_my_youtube_audio(
     skip: int = 0,
     limit: int = 20,
     current_user: dict = Depends(get_current_user)
 ):
-    cursor = audio_clips_collection.find({
+    clips = await list_clips({
         "user_id": str(current_user.get("_id")),
         "youtube_url": {"$exists": True, "$ne": None}
-    }).skip(skip).limit(limit)
-    audio_list = []
-    async for doc in cursor:
-        doc["_id"] = str(doc["_id"])  # Convert ObjectId to string
-        audio_list.append(AudioClipInDB(**doc))
-    return audio_list
+    }, skip, limit)
+    return ORJSONResponse(clips)
+
+@app.get("/my-emotion-stats", response_model=EmotionStatsResponse)
+async def get_my_emotion_stats(
+    days: int = Query(30, ge=1, le=3660),
+    current_user: dict = Depends(get_current_user)
+):
+    """Per-day emotion counts for the last ``days`` days, read from the rollup collection."""
+    return await get_emotion_stats(str(current_user.get("_id")), days)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
+    # No in-process server here: spawned decode workers re-import the main
+    # module, and as __main__ this one would load the model in every worker
+    raise SystemExit("Start the API with `uvicorn app:app` or `python start_server.py`")
\ No newline at end of file
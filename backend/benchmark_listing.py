@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark /my-audio listing latency for a user with many saved clips.
+
+Compares the old path (AudioClipInDB validation + default JSON encoding)
+with the lean path (direct dict serialization + orjson), and times the
+real endpoint in-process with and without gzip when httpx is installed.
+
+Uses the in-memory Mongo stand-in unless --mongo-url is given.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=5000, help="Clips to seed for the benchmark user")
+    parser.add_argument("--samples", type=int, default=2000, help="audio_data floats per clip")
+    parser.add_argument("--limit", type=int, default=500, help="Page size requested from /my-audio")
+    parser.add_argument("--repeat", type=int, default=10, help="Timed runs per variant")
+    parser.add_argument("--mongo-url", default=None, help="Benchmark against a real MongoDB instead")
+    return parser.parse_args()
+
+def report(name, timings, size=None):
+    timings = sorted(timings)
+    p50 = statistics.median(timings) * 1000
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000
+    extra = f"  {size / 1024:.0f} KiB" if size is not None else ""
+    print(f"{name:<36} p50 {p50:8.1f} ms   p95 {p95:8.1f} ms{extra}")
+
+async def run(args):
+    import numpy as np
+    from datetime import datetime, timezone
+    from fastapi.encoders import jsonable_encoder
+    import orjson
+
+    from core.db.mongo import audio_clips_collection
+    from core.schemas.audio import AudioClipInDB
+    from core.schemas.user import UserCreate
+    from core.security import create_access_token
+    from core.services.clip_service import serialize_clip
+    from core.services.user_service import create_user, get_user_by_email
+
+    email = "bench-listing@example.com"
+    user = await get_user_by_email(email)
+    if not user:
+        await create_user(UserCreate(email=email, password="benchmark", name="Benchmark"))
+        user = await get_user_by_email(email)
+    user_id = str(user["_id"])
+
+    existing = await audio_clips_collection.count_documents({"user_id": user_id})
+    if existing < args.clips:
+        print(f"Seeding {args.clips - existing} clips...")
+        rng = np.random.default_rng(0)
+        docs = [{
+            "user_id": user_id,
+            "email": email,
+            "audio_data": rng.uniform(-1, 1, args.samples).astype(np.float32).tolist(),
+            "emotion": "neutral",
+            "timestamp": time.time(),
+            "notes": None,
+            "created_at": datetime.now(timezone.utc),
+        } for _ in range(args.clips - existing)]
+        for i in range(0, len(docs), 500):
+            await audio_clips_collection.insert_many(docs[i:i + 500])
+
+    async def fetch():
+        cursor = audio_clips_collection.find({"user_id": user_id}).limit(args.limit)
+        return [doc async for doc in cursor]
+
+    async def legacy():
+        docs = await fetch()
+        clips = []
+        for doc in docs:
+            doc["_id"] = str(doc["_id"])
+            clips.append(AudioClipInDB(**doc))
+        return json.dumps(jsonable_encoder(clips)).encode()
+
+    async def lean():
+        return orjson.dumps([serialize_clip(doc) for doc in await fetch()])
+
+    print(f"\nListing {args.limit} of {args.clips} clips ({args.samples} samples each)\n")
+    for name, fn in (("legacy (validate + json)", legacy), ("lean (dicts + orjson)", lean)):
+        await fn()  # warm-up
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            body = await fn()
+            timings.append(time.perf_counter() - start)
+        report(name, timings, len(body))
+
+    try:
+        import httpx
+    except ImportError:
+        print("\nhttpx not installed; skipping end-to-end /my-audio timings")
+        return
+
+    from app import app
+
+    token = create_access_token({"sub": email})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, encoding in (("GET /my-audio (identity)", "identity"), ("GET /my-audio (gzip)", "gzip")):
+            headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+            params = {"limit": args.limit}
+            await client.get("/my-audio", headers=headers, params=params)
+            timings = []
+            size = 0
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                response = await client.get("/my-audio", headers=headers, params=params)
+                timings.append(time.perf_counter() - start)
+                response.raise_for_status()
+                size = response.num_bytes_downloaded
+            report(name, timings, size)
+
+def main():
+    args = parse_args()
+    os.environ["MONGO_URL"] = args.mongo_url or os.environ.get("BENCH_MONGO_URL", "memory://")
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Offline bulk emotion scoring for directories or manifests of audio files.
+
+Decodes files across a process pool, runs the model in large batches and
+appends one result per file to a JSONL or CSV output as batches finish.
+Re-running with the same output resumes where an interrupted run stopped.
+
+    python bulk_score.py recordings/ -o results.jsonl --probabilities
+    python bulk_score.py manifest.csv -o results.csv --workers 8 --batch-size 128
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".opus", ".m4a", ".webm", ".aac"}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Directory of audio files, or a manifest (.txt: one path per line, "
+                                      ".csv: 'path' or 'file' column)")
+    parser.add_argument("-o", "--output", required=True, help="Results file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Decode processes")
+    parser.add_argument("--batch-size", type=int, default=64, help="Clips per model forward pass")
+    parser.add_argument("--probabilities", action="store_true", help="Include per-emotion probabilities")
+    parser.add_argument("--retry-failed", action="store_true", help="On resume, rescore files that failed before")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    parser.add_argument("--progress-every", type=float, default=10.0, help="Seconds between progress lines")
+    return parser.parse_args()
+
+def collect_files(source: str):
+    if os.path.isdir(source):
+        files = []
+        for root, _, names in os.walk(source):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    files.append(os.path.join(root, name))
+        return sorted(files)
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, newline="") as f:
+        if source.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            column = "path" if "path" in (reader.fieldnames or []) else "file"
+            paths = [row[column] for row in reader if row.get(column)]
+        else:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in paths]
+
+def _records(text: str, fmt: str):
+    """Yield (row, end offset) for each complete record of ``text``; the CSV header yields row None."""
+    lines = re.findall(r"[^\n]*\n|[^\n]+$", text)
+    if fmt != "csv":
+        end = 0
+        for line in lines:
+            end += len(line)
+            if not line.endswith("\n") or not line.strip():
+                continue
+            try:
+                yield json.loads(line), end
+            except ValueError:
+                continue
+        return
+
+    end = 0
+    def tracked():
+        nonlocal end
+        for line in lines:
+            end += len(line)
+            yield line
+    reader = csv.reader(tracked())
+    header = None
+    try:
+        for fields in reader:
+            # A record cut off mid-write lacks its line ending or trailing fields
+            if text[end - 1:end] != "\n" or (header is not None and len(fields) != len(header)):
+                return
+            if header is None:
+                header = fields
+                yield None, end
+            else:
+                yield dict(zip(header, fields)), end
+    except csv.Error:
+        return
+
+def load_done(output: str, fmt: str, retry_failed: bool):
+    """Files already scored in ``output``; cuts off a record left half-written by a killed run."""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, newline="", errors="surrogateescape") as f:
+        text = f.read()
+        encoding = f.encoding
+    complete = 0
+    for row, end in _records(text, fmt):
+        complete = end
+        if row is None:
+            continue
+        success = row.get("success") in (True, "True", "true")
+        if success or not retry_failed:
+            done.add(row["file"])
+    if complete < len(text):
+        # New rows are appended, so they must not start on the broken line
+        print(f"Dropping an incomplete last record from {output}", file=sys.stderr)
+        with open(output, "r+b") as f:
+            f.truncate(len(text[:complete].encode(encoding, errors="surrogateescape")))
+    return done
+
+def decode(path: str, duration: float):
+    """Pool worker: decode one file and time it."""
+    from core.services.audio_service import load_audio_file
+    start = time.perf_counter()
+    audio = load_audio_file(path, duration=duration)
+    return audio, time.perf_counter() - start
+
+class ResultWriter:
+    def __init__(self, path: str, fmt: str, emotions, probabilities: bool, append: bool):
+        self.fmt = fmt
+        self.emotions = emotions
+        self.probabilities = probabilities
+        fresh = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self.f = open(path, "a" if append else "w", newline="")
+        if fmt == "csv":
+            fields = ["file", "emotion", "success", "error", "confidence", "model_version", "decode_time", "model_time"]
+            if probabilities:
+                fields += [f"p_{emotion}" for emotion in emotions]
+            self.writer = csv.DictWriter(self.f, fieldnames=fields)
+            if fresh:
+                self.writer.writeheader()
+
+    def write(self, row: dict):
+        if self.fmt == "csv":
+            flat = {k: v for k, v in row.items() if k != "probabilities"}
+            for emotion, p in (row.get("probabilities") or {}).items():
+                flat[f"p_{emotion}"] = p
+            self.writer.writerow(flat)
+        else:
+            self.f.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        # Flush after every batch so an interrupted run loses at most one batch
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.f.close()
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    fmt = args.format or ("csv" if args.output.lower().endswith(".csv") else "jsonl")
+
+    files = collect_files(args.input)
+    done = set() if args.no_resume else load_done(args.output, fmt, args.retry_failed)
+    todo = [path for path in files if path not in done]
+    print(f"{len(files)} files found, {len(files) - len(todo)} already scored, {len(todo)} to go", file=sys.stderr)
+    if not todo:
+        return
+
+    # Imported here so decode workers (spawned with this module as __main__) don't load the model
+    from improved_inference import DURATION, predict_batch, registry
+
+    emotions = registry.active.emotions
+    writer = ResultWriter(args.output, fmt, emotions, args.probabilities, append=not args.no_resume)
+    pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    max_in_flight = max(args.batch_size * 2, args.workers * 4)
+
+    scored = failed = 0
+    start = last_report = time.perf_counter()
+    pending = {}
+    batch = []
+    queue = iter(todo)
+
+    def write_batch():
+        nonlocal scored
+        model_start = time.perf_counter()
+        # The cascade stage doesn't produce the CNN's full probability vector
+        predictions = predict_batch([audio for _, audio, _ in batch], use_cascade=not args.probabilities)
+        model_time = (time.perf_counter() - model_start) / len(batch)
+        for (path, _, decode_time), prediction in zip(batch, predictions):
+            row = {"file": path, "emotion": prediction.emotion, "success": True, "error": None,
+                   "confidence": round(prediction.confidence, 5), "model_version": prediction.model_version,
+                   "decode_time": round(decode_time, 4), "model_time": round(model_time, 4)}
+            if args.probabilities:
+                row["probabilities"] = {e: round(float(p), 5) for e, p in zip(emotions, prediction.probabilities)}
+            writer.write(row)
+        writer.flush()
+        scored += len(batch)
+        batch.clear()
+
+    try:
+        while True:
+            for path in queue:
+                pending[pool.submit(decode, path, DURATION)] = path
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                path = pending.pop(future)
+                try:
+                    audio, decode_time = future.result()
+                    batch.append((path, audio, decode_time))
+                except Exception as e:
+                    writer.write({"file": path, "emotion": None, "success": False, "error": str(e),
+                                  "confidence": None, "model_version": None, "decode_time": None, "model_time": None})
+                    failed += 1
+
+            if len(batch) >= args.batch_size or (batch and not pending):
+                write_batch()
+
+            now = time.perf_counter()
+            if now - last_report >= args.progress_every:
+                last_report = now
+                rate = (scored + failed) / (now - start)
+                print(f"{scored + failed}/{len(todo)} files  {rate:.1f} files/sec  ({failed} failed)", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nInterrupted; re-run the same command to resume", file=sys.stderr)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        writer.flush()
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {scored} files ({failed} failed) in {elapsed:.1f}s "
+          f"- {(scored + failed) / elapsed:.1f} files/sec", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
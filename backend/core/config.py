@@ -11,6 +11,26 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    MAX_UPLOAD_SIZE: int = int(os.getenv("MAX_UPLOAD_SIZE", "50"))  # MB, caps JSON audio bodies
+    DECODE_WORKERS: int = int(os.getenv("DECODE_WORKERS", str(os.cpu_count() or 2)))
+    MAX_BATCH_FILES: int = int(os.getenv("MAX_BATCH_FILES", "500"))
+    PIPELINE_DECODE_WORKERS: int = int(os.getenv("PIPELINE_DECODE_WORKERS", "2"))
+    PIPELINE_FEATURE_WORKERS: int = int(os.getenv("PIPELINE_FEATURE_WORKERS", "2"))
+    PIPELINE_MODEL_WORKERS: int = int(os.getenv("PIPELINE_MODEL_WORKERS", "1"))
+    PIPELINE_MODEL_BATCH: int = int(os.getenv("PIPELINE_MODEL_BATCH", "16"))
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "64"))
+    PIPELINE_TIMEOUT: float = float(os.getenv("PIPELINE_TIMEOUT", "60"))
+    WRITE_BUFFER_MAX_BATCH: int = int(os.getenv("WRITE_BUFFER_MAX_BATCH", "100"))
+    WRITE_BUFFER_FLUSH_MS: float = float(os.getenv("WRITE_BUFFER_FLUSH_MS", "50"))
+    WRITE_BUFFER_MAX_PENDING: int = int(os.getenv("WRITE_BUFFER_MAX_PENDING", "5000"))
+    FEATURE_CACHE_DIR: str = os.getenv(
+        "FEATURE_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "feature_cache"))
+    FEATURE_CACHE_ON_SAVE: bool = os.getenv("FEATURE_CACHE_ON_SAVE", "false").lower() in ("1", "true", "yes")
+    FEATURE_CACHE_SHARD_SIZE: int = int(os.getenv("FEATURE_CACHE_SHARD_SIZE", "256"))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "32"))
+    SIMILARITY_CACHE_USERS: int = int(os.getenv("SIMILARITY_CACHE_USERS", "256"))
+    SIMILARITY_CACHE_MB: int = int(os.getenv("SIMILARITY_CACHE_MB", "256"))
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN", "")
     
     def __init__(self):
         if not self.SECRET_KEY:
@@ -0,0 +1,255 @@
+"""
+In-process stand-in for the small slice of the Motor API this backend uses.
+
+Selected with ``MONGO_URL=memory://`` so benchmarks, load tests and local
+experiments can run the real app without a MongoDB server. Data lives only
+for the lifetime of the process.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import BulkWriteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_MISSING = object()
+
+def _get_path(doc: dict, key: str):
+    value: Any = doc
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+def _set_path(doc: dict, key: str, value):
+    parts = key.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+def _match_condition(value, condition) -> bool:
+    if not isinstance(condition, dict) or not any(k.startswith("$") for k in condition):
+        return value is not _MISSING and value == condition
+    for op, arg in condition.items():
+        if op == "$exists":
+            if (value is not _MISSING) != bool(arg):
+                return False
+        elif op == "$ne":
+            if value is not _MISSING and value == arg:
+                return False
+        elif op == "$in":
+            if value is _MISSING or value not in arg:
+                return False
+        elif op == "$nin":
+            if value is not _MISSING and value in arg:
+                return False
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is _MISSING or value is None:
+                return False
+            if op == "$gt" and not value > arg:
+                return False
+            if op == "$gte" and not value >= arg:
+                return False
+            if op == "$lt" and not value < arg:
+                return False
+            if op == "$lte" and not value <= arg:
+                return False
+        else:
+            raise NotImplementedError(f"Unsupported query operator in memory backend: {op}")
+    return True
+
+def _matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, sub) for sub in condition):
+                return False
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return dict(doc)
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        out = {k: doc[k] for k in include if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    return {k: v for k, v in doc.items() if projection.get(k, 1)}
+
+def _sort_key(doc: dict, field: str):
+    value = _get_path(doc, field)
+    if value is _MISSING or value is None:
+        return (0, None)
+    return (1, value)
+
+class MemoryCursor:
+    def __init__(self, docs: List[dict], projection: Optional[dict] = None):
+        self._docs = docs
+        self._projection = projection
+        self._skip = 0
+        self._limit = 0
+        self._iter = None
+
+    def sort(self, key, direction: int = 1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda d: _sort_key(d, field), reverse=order < 0)
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    def _window(self):
+        end = self._skip + self._limit if self._limit else None
+        return self._docs[self._skip:end]
+
+    def __aiter__(self):
+        self._iter = iter(self._window())
+        return self
+
+    async def __anext__(self):
+        try:
+            return _project(next(self._iter), self._projection)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length: Optional[int] = None):
+        docs = self._window()
+        if length:
+            docs = docs[:length]
+        return [_project(d, self._projection) for d in docs]
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self._docs: Dict[Any, dict] = {}
+
+    async def create_index(self, keys, **kwargs):
+        return "memory_index"
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self._docs:
+            raise DuplicateKeyError(f"E11000 duplicate key error dup key: {{ _id: {document['_id']} }}", 11000)
+        self._docs[document["_id"]] = dict(document)
+        return InsertOneResult(document["_id"], acknowledged=True)
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True) -> InsertManyResult:
+        inserted, errors = [], []
+        for i, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            if document["_id"] in self._docs:
+                errors.append({"index": i, "code": 11000, "errmsg": "duplicate key error"})
+                if ordered:
+                    break
+                continue
+            self._docs[document["_id"]] = dict(document)
+            inserted.append(document["_id"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertManyResult(inserted, acknowledged=True)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        for doc in self._docs.values():
+            if _matches(doc, query):
+                return _project(doc, projection)
+        return None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor([d for d in self._docs.values() if _matches(d, query)], projection)
+
+    async def count_documents(self, query: Optional[dict] = None) -> int:
+        return sum(1 for d in self._docs.values() if _matches(d, query))
+
+    def _apply_update(self, doc: dict, update: dict, inserting: bool):
+        for op, fields in update.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                for key, value in fields.items():
+                    _set_path(doc, key, value)
+            elif op == "$inc":
+                for key, value in fields.items():
+                    current = _get_path(doc, key)
+                    _set_path(doc, key, (0 if current is _MISSING else current) + value)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(f"Unsupported update operator in memory backend: {op}")
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False) -> UpdateResult:
+        if list(query) == ["_id"] and not isinstance(query["_id"], dict):
+            candidates = [self._docs[query["_id"]]] if query["_id"] in self._docs else []
+        else:
+            candidates = self._docs.values()
+        for doc in candidates:
+            if _matches(doc, query):
+                self._apply_update(doc, update, inserting=False)
+                return UpdateResult({"n": 1, "nModified": 1}, acknowledged=True)
+        if not upsert:
+            return UpdateResult({"n": 0, "nModified": 0}, acknowledged=True)
+        doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply_update(doc, update, inserting=True)
+        doc.setdefault("_id", ObjectId())
+        self._docs[doc["_id"]] = doc
+        return UpdateResult({"n": 1, "nModified": 0, "upserted": doc["_id"]}, acknowledged=True)
+
+    async def update_many(self, query: dict, update: dict) -> UpdateResult:
+        n = 0
+        for doc in self._docs.values():
+            if _matches(doc, query):
+                self._apply_update(doc, update, inserting=False)
+                n += 1
+        return UpdateResult({"n": n, "nModified": n}, acknowledged=True)
+
+    async def bulk_write(self, requests: list, ordered: bool = True) -> BulkWriteResult:
+        # UpdateOne only; reads pymongo's request attributes
+        matched = modified = 0
+        upserted = []
+        for i, request in enumerate(requests):
+            if not isinstance(request, UpdateOne):
+                raise NotImplementedError(f"Unsupported bulk operation in memory backend: {type(request).__name__}")
+            result = await self.update_one(request._filter, request._doc, upsert=bool(request._upsert))
+            matched += result.matched_count
+            modified += result.modified_count
+            if result.upserted_id is not None:
+                upserted.append({"index": i, "_id": result.upserted_id})
+        return BulkWriteResult({"nMatched": matched, "nModified": modified, "nUpserted": len(upserted),
+                                "nInserted": 0, "nRemoved": 0, "upserted": upserted}, acknowledged=True)
+
+    async def delete_many(self, query: dict):
+        for key in [k for k, d in self._docs.items() if _matches(d, query)]:
+            del self._docs[key]
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+class MemoryClient:
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._databases:
+            self._databases[name] = MemoryDatabase(name)
+        return self._databases[name]
+
+    def close(self):
+        pass
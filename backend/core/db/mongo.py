@@ -1,7 +1,12 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from core.config import settings
 
-mongo_client = AsyncIOMotorClient(settings.MONGO_URL)
+if settings.MONGO_URL.startswith("memory://"):
+    from core.db.memory import MemoryClient
+    mongo_client = MemoryClient()
+else:
+    mongo_client = AsyncIOMotorClient(settings.MONGO_URL)
 db = mongo_client["voice_emotion_db"]
 users_collection = db["users"]
-audio_clips_collection = db["audio_clips"] 
\ No newline at end of file
+audio_clips_collection = db["audio_clips"]
+emotion_stats_collection = db["emotion_daily_stats"]
\ No newline at end of file
@@ -0,0 +1,226 @@
+"""
+Write-behind buffer that turns per-request inserts into batched insert_many.
+
+Documents get a client-side ObjectId, so callers know the id immediately.
+A single background task writes whatever has accumulated with
+``insert_many(ordered=False)`` once ``max_batch`` documents are waiting or
+``flush_interval`` seconds have passed, whichever comes first. Callers that
+must not return before the write is acknowledged pass ``durable=True``: the
+document still shares a batch with concurrent writers (group commit), but
+the call waits for that batch and raises if the document was not written.
+
+Works with any collection exposing Motor's ``insert_many``, including the
+in-memory stand-in (``MONGO_URL=memory://``).
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, DuplicateKeyError, NetworkTimeout
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+# Errors worth retrying; anything else (DocumentTooLarge, InvalidDocument...)
+# will fail again and is reported per document instead
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout, ConnectionFailure)
+
+class _Pending:
+    __slots__ = ("doc", "future", "attempts")
+
+    def __init__(self, doc: dict, future: Optional[asyncio.Future]):
+        self.doc = doc
+        self.future = future
+        self.attempts = 0
+
+class BufferedWriter:
+    def __init__(self, collection, max_batch: int = 100, flush_interval: float = 0.05,
+                 max_pending: int = 5000, max_retries: int = 5,
+                 on_flush: Optional[Callable[[List[dict]], Awaitable[None]]] = None):
+        self.collection = collection
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.on_flush = on_flush
+        self._pending: List[_Pending] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        self.write_time = 0.0
+
+    def start(self):
+        self._closing = False
+        self._wake = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, attempts: int = 3):
+        """Stop the background task and write everything still buffered.
+
+        Flushes until the buffer is empty; gives up only after ``attempts``
+        flushes in a row hit transient errors.
+        """
+        if self._task is not None:
+            # Let _run finish its current flush and return; cancelling it
+            # through wait_for can be swallowed when the wake event is set
+            self._closing = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        failures = 0
+        while self._pending and failures < attempts:
+            if await self.flush():
+                failures = 0
+            else:
+                failures += 1
+                await asyncio.sleep(self.flush_interval)
+        if self._pending:
+            logger.error(f"Dropping {len(self._pending)} buffered documents that could not be written")
+            self._fail(self._pending, RuntimeError("Write buffer closed before the document was written"))
+            self._pending = []
+
+    async def insert(self, doc: dict, durable: bool = False) -> ObjectId:
+        """Queue ``doc`` for insertion and return its ``_id``.
+
+        Without a running writer (scripts, tests) this falls back to a
+        direct ``insert_one``.
+        """
+        doc.setdefault("_id", ObjectId())
+        if self._task is None:
+            await self.collection.insert_one(doc)
+            await self._notify([doc])
+            return doc["_id"]
+
+        while len(self._pending) >= self.max_pending:
+            # Backpressure: the database is not keeping up
+            self._space.clear()
+            self._wake.set()
+            await self._space.wait()
+
+        future = asyncio.get_running_loop().create_future() if durable else None
+        self._pending.append(_Pending(doc, future))
+        if durable or len(self._pending) >= self.max_batch:
+            self._wake.set()
+        if future is not None:
+            await future
+        return doc["_id"]
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self._pending and not self._closing:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Write buffer flush failed: {str(e)}")
+
+    async def flush(self) -> bool:
+        """Write up to ``max_batch`` buffered documents; False if a transient error deferred some."""
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if not batch:
+            return True
+        if len(self._pending) < self.max_pending and self._space is not None:
+            self._space.set()
+
+        start = time.perf_counter()
+        try:
+            written, retry, failed = await self._write(batch)
+        finally:
+            self.write_time += time.perf_counter() - start
+            self.batches += 1
+
+        for pending, error in failed:
+            logger.error(f"Buffered insert failed: {str(error)}")
+        requeue = []
+        for pending, error in retry:
+            pending.attempts += 1
+            if pending.future is not None or pending.attempts > self.max_retries:
+                # Durable callers get the error now rather than waiting on retries
+                failed.append((pending, error))
+            else:
+                requeue.append(pending)
+        if requeue:
+            logger.warning(f"Buffered insert of {len(requeue)} documents failed, will retry: {str(retry[0][1])}")
+            self._pending[:0] = requeue
+        if len(retry) > len(requeue):
+            logger.error(f"Giving up on {len(retry) - len(requeue)} documents after transient errors")
+        for pending, error in failed:
+            self._fail([pending], error)
+        self.failed += len(failed)
+        self.inserted += len(written)
+
+        for pending in written:
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result(pending.doc["_id"])
+        await self._notify([p.doc for p in written])
+        return not retry
+
+    async def _write(self, batch: List[_Pending]):
+        """Insert a batch; returns (written, retryable [(p, error)], failed [(p, error)])."""
+        try:
+            await self.collection.insert_many([p.doc for p in batch], ordered=False)
+            return batch, [], []
+        except BulkWriteError as e:
+            rejected = {}
+            for error in e.details.get("writeErrors", []):
+                # The _id is ours, so a duplicate means an earlier attempt
+                # already wrote this document
+                if error.get("code") != DUPLICATE_KEY:
+                    rejected[error["index"]] = RuntimeError(error.get("errmsg", "Document was rejected"))
+            return ([p for i, p in enumerate(batch) if i not in rejected], [],
+                    [(batch[i], error) for i, error in rejected.items()])
+        except TRANSIENT_ERRORS as e:
+            return [], [(p, e) for p in batch], []
+        except Exception:
+            # Client-side rejection of the whole batch (e.g. one document too
+            # large): insert one by one so only the bad documents fail
+            written, retry, failed = [], [], []
+            for pending in batch:
+                try:
+                    await self.collection.insert_one(pending.doc)
+                    written.append(pending)
+                except DuplicateKeyError:
+                    written.append(pending)
+                except TRANSIENT_ERRORS as e:
+                    retry.append((pending, e))
+                except Exception as e:
+                    failed.append((pending, e))
+            return written, retry, failed
+
+    async def _notify(self, docs: List[dict]):
+        # Follow-up work runs only once documents are really in the collection
+        if self.on_flush is None or not docs:
+            return
+        try:
+            await self.on_flush(docs)
+        except Exception as e:
+            logger.error(f"Write buffer on_flush hook failed: {str(e)}")
+
+    def _fail(self, pending: List[_Pending], error: Exception):
+        for p in pending:
+            if p.future is not None and not p.future.done():
+                p.future.set_exception(error)
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "avg_batch": (self.inserted + self.failed) / self.batches if self.batches else None,
+            "avg_write_ms": 1000 * self.write_time / self.batches if self.batches else None,
+        }
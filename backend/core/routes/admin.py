@@ -0,0 +1,49 @@
+import os
+import hmac
+from fastapi import APIRouter, HTTPException, Depends, Header
+from core.config import settings
+from core.schemas.model import ModelLoadRequest
+from improved_inference import registry, MODEL_DIR
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+async def require_admin(x_admin_token: str = Header(None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+def _resolve_checkpoint(path: str) -> str:
+    # Checkpoints are unpickled with weights_only=False, so only files that
+    # were deliberately placed in MODEL_DIR may be loaded
+    full_path = os.path.realpath(os.path.join(MODEL_DIR, path))
+    if os.path.dirname(full_path) != os.path.realpath(MODEL_DIR):
+        raise HTTPException(status_code=400, detail="Checkpoint must be a file inside MODEL_DIR")
+    if not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Checkpoint not found")
+    return full_path
+
+@router.get("/model", dependencies=[Depends(require_admin)])
+async def get_model_status():
+    return registry.status()
+
+@router.post("/model/load", status_code=202, dependencies=[Depends(require_admin)])
+async def load_model(body: ModelLoadRequest):
+    """Load and warm a checkpoint in the background; poll GET /admin/model for progress."""
+    if registry.loading:
+        raise HTTPException(status_code=409, detail="A model is already loading")
+    registry.load_in_background(_resolve_checkpoint(body.path), body.version, body.shadow, body.sample_rate)
+    return {"msg": "Model loading started", "shadow": body.shadow}
+
+@router.post("/model/promote", dependencies=[Depends(require_admin)])
+async def promote_shadow_model():
+    try:
+        promoted = registry.promote_shadow()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"msg": "Shadow model promoted", "model_version": promoted.version}
+
+@router.delete("/model/shadow", dependencies=[Depends(require_admin)])
+async def clear_shadow_model():
+    registry.clear_shadow()
+    return {"msg": "Shadow model cleared"}
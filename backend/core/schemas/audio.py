@@ -14,6 +14,27 @@ class AudioClipInDB(AudioClipCreate):
     email: EmailStr = Field(..., description="Email of the user")
     created_at: datetime = Field(..., description="UTC datetime when the audio was saved")
     youtube_url: Optional[str] = Field(None, description="YouTube URL if audio is from YouTube")
+    model_version: Optional[str] = Field(None, description="Version of the model that predicted the emotion")
+    emotion_source: Optional[str] = Field(
+        None, description="Where the emotion came from: user, model, or fallback when prediction failed")
+
+class AudioClipOut(BaseModel):
+    """Response shape for clip listings.
+
+    Documents only: listing routes serialize trusted DB documents directly
+    instead of re-validating them through AudioClipInDB.
+    """
+    id: Optional[str] = Field(None, alias="_id")
+    user_id: str
+    email: str
+    audio_data: Optional[List[float]] = None
+    emotion: Optional[str] = None
+    timestamp: Optional[float] = None
+    notes: Optional[str] = None
+    created_at: datetime
+    youtube_url: Optional[str] = None
+    model_version: Optional[str] = None
+    emotion_source: Optional[str] = None
 
 class YouTubeAudioRequest(BaseModel):
     youtube_url: str
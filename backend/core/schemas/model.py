@@ -0,0 +1,8 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class ModelLoadRequest(BaseModel):
+    path: str = Field(..., description="Checkpoint file name inside MODEL_DIR")
+    version: Optional[str] = Field(None, description="Version label (defaults to file name + content hash)")
+    shadow: bool = Field(False, description="Load as shadow candidate instead of swapping it in")
+    sample_rate: float = Field(0.1, ge=0.0, le=1.0, description="Fraction of traffic scored by the shadow model")
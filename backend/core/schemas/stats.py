@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+
+class EmotionDayStats(BaseModel):
+    day: str = Field(..., description="UTC day (YYYY-MM-DD)")
+    counts: Dict[str, int] = Field(default_factory=dict, description="Clips per emotion that day")
+    total: int = 0
+
+class EmotionStatsResponse(BaseModel):
+    days: List[EmotionDayStats]
+    totals: Dict[str, int]
+    total: int
@@ -0,0 +1,240 @@
+"""
+Streaming parser for JSON bodies that carry raw samples in ``audio_data``.
+
+Legacy clients post ``{"audio_data": [0.01, -0.02, ...], ...}``. Letting
+FastAPI/pydantic handle that builds a list of Python floats (24+ bytes
+each, plus the list slot) that ``np.array`` then copies again. Here the
+request stream is scanned as it arrives: the ``audio_data`` array is parsed
+chunk by chunk straight into a growable float32 buffer (float64 where the
+samples are stored as sent), and only the small
+remainder of the object (with ``null`` in place of the array) goes through
+``json.loads`` and the pydantic model. The body size is capped before and
+while reading.
+
+Only plain JSON numbers take the fast path. If the array holds anything
+else (strings, booleans, NaN), the rest of it is kept as text and the whole
+list goes through ``json.loads`` and pydantic's ``List[float]`` like any
+other field, so the same bodies are accepted and rejected as before. A
+repeated ``audio_data`` key keeps the last value, as ``json.loads`` does.
+"""
+
+import json
+import re
+from typing import List, Optional, Tuple, Type
+
+import numpy as np
+from fastapi import HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+from core.config import settings
+
+AUDIO_FIELD = b"audio_data"
+
+_OUTSIDE_STRING = re.compile(rb'["{}\[\]:,]')
+_INSIDE_STRING = re.compile(rb'["\\]')
+_WHITESPACE = b" \t\r\n"
+# JSON number grammar; possessive quantifiers (Python 3.11+) keep the check
+# well under the cost of converting the values
+_NUMBER = rb"[ \t\r\n]*+-?+(?:0|[1-9][0-9]*+)(?:\.[0-9]++)?+(?:[eE][+-]?+[0-9]++)?+[ \t\r\n]*+"
+_NUMBER_LIST = re.compile(_NUMBER + rb"(?:," + _NUMBER + rb")*+")
+
+class AudioJSONParser:
+    """Incremental parser: ``feed`` chunks, then ``finish`` for the samples and other fields."""
+
+    def __init__(self, expected_bytes: Optional[int] = None, dtype=np.float32):
+        # Serialized samples usually take 10-20 bytes ("-0.0123456789,");
+        # start near that count and grow if the client sends shorter ones
+        capacity = max(1024, expected_bytes // 16) if expected_bytes else 64 * 1024
+        self.dtype = dtype
+        self.samples = np.empty(capacity, dtype=dtype)
+        self.count = 0
+        self.found = False
+        # Array text from the first element that isn't a plain number on
+        self._fallback: Optional[List[bytes]] = None
+        self._rest = bytearray()
+        self._in_array = False
+        self._tail = b""
+        self._after_comma = False
+        # Scanner state for the parts of the object outside the array
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string = bytearray()
+        self._key = None
+        self._awaiting_value = False
+
+    def feed(self, chunk: bytes):
+        pos = 0
+        while pos < len(chunk):
+            if self._in_array:
+                pos = self._feed_array(chunk, pos)
+            else:
+                pos = self._feed_outside(chunk, pos)
+
+    def _feed_outside(self, chunk: bytes, pos: int) -> int:
+        start = pos
+        while pos < len(chunk):
+            if self._awaiting_value:
+                byte = chunk[pos:pos + 1]
+                if byte in _WHITESPACE:
+                    pos += 1
+                    continue
+                self._awaiting_value = False
+                # A repeated key replaces the earlier value
+                self.count = 0
+                self._fallback = None
+                if byte == b"[":
+                    self._rest += chunk[start:pos] + b"null"
+                    self._in_array = True
+                    self._after_comma = False
+                    self.found = True
+                    return pos + 1
+                # Not an array: leave it for the model to reject
+                self.found = False
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    pos += 1
+                    continue
+                match = _INSIDE_STRING.search(chunk, pos)
+                end = match.start() if match else len(chunk)
+                if self._depth == 1 and len(self._string) <= len(AUDIO_FIELD):
+                    self._string += chunk[pos:end]
+                if match is None:
+                    pos = end
+                elif match.group() == b"\\":
+                    self._escape = True
+                    self._string += b"\\"
+                    pos = end + 1
+                else:
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._key = bytes(self._string)
+                    pos = end + 1
+                continue
+
+            match = _OUTSIDE_STRING.search(chunk, pos)
+            if match is None:
+                pos = len(chunk)
+                continue
+            token = match.group()
+            pos = match.end()
+            if token == b'"':
+                self._in_string = True
+                self._string = bytearray()
+            elif token in (b"{", b"["):
+                self._depth += 1
+            elif token in (b"}", b"]"):
+                self._depth -= 1
+            elif token == b":":
+                if self._depth == 1 and self._key == AUDIO_FIELD:
+                    self._awaiting_value = True
+            self._key = None if token != b":" else self._key
+        self._rest += chunk[start:pos]
+        return pos
+
+    def _feed_array(self, chunk: bytes, pos: int) -> int:
+        close = chunk.find(b"]", pos)
+        if close == -1:
+            data = self._tail + chunk[pos:]
+            split = data.rfind(b",")
+            if split == -1:
+                self._tail = data
+            else:
+                self._tail = data[split + 1:]
+                self._after_comma = True
+                self._append(data[:split])
+            return len(chunk)
+
+        data = self._tail + chunk[pos:close]
+        self._tail = b""
+        self._in_array = False
+        if data.strip(_WHITESPACE):
+            self._append(data)
+        elif self._after_comma:
+            raise ValueError("Trailing comma in audio_data")
+        return close + 1
+
+    def _append(self, data: bytes):
+        if self._fallback is None and not _NUMBER_LIST.fullmatch(data):
+            self._fallback = []
+        if self._fallback is not None:
+            self._fallback.append(data)
+            return
+        values = np.array(data.split(b","), dtype=self.dtype)
+        needed = self.count + len(values)
+        if needed > len(self.samples):
+            grown = np.empty(max(needed, len(self.samples) * 2), dtype=self.dtype)
+            grown[:self.count] = self.samples[:self.count]
+            self.samples = grown
+        self.samples[self.count:needed] = values
+        self.count = needed
+
+    def finish(self) -> Tuple[Optional[np.ndarray], object]:
+        """Return the samples and the decoded remainder of the body.
+
+        If the array wasn't all plain numbers, the samples are None and the
+        remainder carries the decoded list in ``audio_data`` instead.
+        """
+        if self._in_array:
+            raise json.JSONDecodeError("Unterminated audio_data array", "", 0)
+        fields = json.loads(self._rest)
+        if self._fallback is not None:
+            values = json.loads(b"[" + b",".join(self._fallback) + b"]")
+            if isinstance(fields, dict):
+                fields["audio_data"] = self.samples[:self.count].tolist() + values
+            return None, fields
+        samples = self.samples[:self.count]
+        if self.count < len(self.samples) * 3 // 4:
+            samples = samples.copy()
+        return samples, fields
+
+def _validation_error(errors: list) -> RequestValidationError:
+    return RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in errors])
+
+async def read_audio_body(request: Request, model: Type[BaseModel],
+                          dtype=np.float32) -> Tuple[np.ndarray, BaseModel]:
+    """Parse a JSON ``model`` body whose ``audio_data`` is a list of floats.
+
+    Returns the samples as ``dtype`` and the model validated with an empty
+    ``audio_data``. Oversized bodies get 413, invalid ones the usual 422.
+    """
+    max_bytes = settings.MAX_UPLOAD_SIZE * 1024 * 1024
+    length = request.headers.get("content-length")
+    expected = int(length) if length and length.isdigit() else None
+    if expected is not None and expected > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body too large (max {settings.MAX_UPLOAD_SIZE} MB)")
+
+    parser = AudioJSONParser(expected, dtype)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise HTTPException(status_code=413,
+                                    detail=f"Request body too large (max {settings.MAX_UPLOAD_SIZE} MB)")
+            parser.feed(chunk)
+        samples, fields = parser.finish()
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError, as are malformed numbers
+        raise _validation_error([{"type": "json_invalid", "loc": (), "msg": "JSON decode error",
+                                  "input": {}, "ctx": {"error": str(e)}}])
+
+    if samples is not None and parser.found and isinstance(fields, dict):
+        fields["audio_data"] = []
+    try:
+        body = model.model_validate(fields)
+    except ValidationError as e:
+        raise _validation_error(e.errors(include_url=False))
+    if samples is None:
+        samples = np.asarray(body.audio_data, dtype=dtype)
+        body.audio_data = []
+    return samples, body
+
+def audio_body_openapi(model: Type[BaseModel]) -> dict:
+    """``openapi_extra`` documenting ``model`` as the request body of a route that parses it itself."""
+    return {"requestBody": {"content": {"application/json": {"schema": model.model_json_schema()}},
+                            "required": True}}
@@ -0,0 +1,64 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from core.config import settings
+
+# Must match improved_inference.SAMPLE_RATE. Kept separate so decode workers
+# don't import the inference module (and load the model) in every process.
+# Spawned workers also re-import the parent's main script, so the server is
+# only started through entry points that don't load the model themselves
+# (uvicorn, start_server.py); app.py refuses to run as __main__.
+SAMPLE_RATE = 22050
+
+_decode_pool: Optional[ProcessPoolExecutor] = None
+
+def clean_audio(audio: np.ndarray) -> np.ndarray:
+    audio = np.nan_to_num(audio)
+    audio = np.clip(audio, -1.0, 1.0)
+    max_val = np.max(np.abs(audio)) if len(audio) else 0.0
+    if max_val > 1.0:
+        audio = audio / max_val
+    return audio.astype(np.float32, copy=False)
+
+def load_audio_file(path: str, sr: int = SAMPLE_RATE, duration: Optional[float] = None) -> np.ndarray:
+    """Decode an audio file to a cleaned mono float32 array at ``sr``.
+
+    Runs inside the decode process pool, so it must stay importable without
+    the model and raise plain exceptions rather than HTTPException.
+    """
+    try:
+        audio, _ = librosa.load(path, sr=sr, mono=True, duration=duration)
+    except Exception:
+        # Try with soundfile as fallback
+        audio, file_sr = sf.read(path, dtype="float32")
+        if audio.ndim > 1:
+            audio = audio[:, 0]  # Take first channel if stereo
+        if duration is not None:
+            audio = audio[:int(duration * file_sr)]
+        if file_sr != sr:
+            audio = librosa.resample(audio, orig_sr=file_sr, target_sr=sr)
+
+    if len(audio) == 0:
+        raise ValueError("Audio file appears to be empty")
+    return clean_audio(audio)
+
+def get_decode_pool() -> ProcessPoolExecutor:
+    global _decode_pool
+    if _decode_pool is None:
+        # spawn avoids forking a process that already holds torch threads
+        _decode_pool = ProcessPoolExecutor(
+            max_workers=settings.DECODE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _decode_pool
+
+def shutdown_decode_pool():
+    global _decode_pool
+    if _decode_pool is not None:
+        _decode_pool.shutdown(wait=False, cancel_futures=True)
+        _decode_pool = None
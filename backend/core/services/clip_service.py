@@ -0,0 +1,162 @@
+import csv
+import io
+import tempfile
+import zipfile
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+import orjson
+import soundfile as sf
+from bson import ObjectId
+
+from core.config import settings
+from core.db.mongo import audio_clips_collection
+from core.db.write_buffer import BufferedWriter
+from core.services.audio_service import SAMPLE_RATE
+from core.services.similarity_service import decode_embedding, embedding_indexes
+from core.services.stats_service import record_emotions
+
+# Keys every listed clip carries, matching the AudioClipOut response shape
+CLIP_FIELDS = ("user_id", "email", "audio_data", "emotion", "timestamp", "notes", "created_at", "youtube_url",
+               "model_version", "emotion_source")
+METADATA_FIELDS = ("id", "wav_file", "emotion", "model_version", "emotion_source", "timestamp", "created_at", "notes",
+                   "youtube_url", "samples")
+
+# Coalesce small writes into chunks of roughly this size before yielding
+STREAM_CHUNK_SIZE = 64 * 1024
+
+async def on_clips_written(docs: List[dict]):
+    """Update the emotion rollups and loaded similarity indexes for new clips."""
+    await record_emotions(docs)
+    for doc in docs:
+        if "embedding" in doc:
+            embedding_indexes.on_insert(doc["user_id"], str(doc["_id"]), decode_embedding(doc["embedding"]),
+                                        doc["embedding_version"])
+
+# New clips are written through this buffer (see core/db/write_buffer.py)
+clip_writer = BufferedWriter(
+    audio_clips_collection,
+    max_batch=settings.WRITE_BUFFER_MAX_BATCH,
+    flush_interval=settings.WRITE_BUFFER_FLUSH_MS / 1000,
+    max_pending=settings.WRITE_BUFFER_MAX_PENDING,
+    on_flush=on_clips_written,
+)
+
+def serialize_clip(doc: dict) -> dict:
+    """Turn a stored clip document into a JSON-ready dict without validation."""
+    out = {"_id": str(doc["_id"])}
+    for field in CLIP_FIELDS:
+        out[field] = doc.get(field)
+    return out
+
+async def list_clips(query: dict, skip: int = 0, limit: int = 20, include_audio: bool = True) -> List[dict]:
+    projection = {"embedding": 0} if include_audio else {"audio_data": 0, "embedding": 0}
+    cursor = audio_clips_collection.find(query, projection).skip(skip).limit(limit)
+    return [serialize_clip(doc) async for doc in cursor]
+
+async def find_clips_by_ids(user_id: str, clip_ids: List[str]) -> List[dict]:
+    """Metadata (no samples) for a user's clips, in no particular order."""
+    cursor = audio_clips_collection.find(
+        {"_id": {"$in": [ObjectId(clip_id) for clip_id in clip_ids]}, "user_id": user_id},
+        {"audio_data": 0, "embedding": 0},
+    )
+    return [serialize_clip(doc) async for doc in cursor]
+
+async def find_embedding_version(user_id: str, clip_id: str) -> Optional[str]:
+    """Model version that embedded one of a user's clips; None if it's missing or has no embedding."""
+    if not ObjectId.is_valid(clip_id):
+        return None
+    doc = await audio_clips_collection.find_one({"_id": ObjectId(clip_id), "user_id": user_id},
+                                                {"embedding_version": 1})
+    return doc.get("embedding_version") if doc else None
+
+def _export_cursor(user_id: str):
+    # A small batch size bounds how many full documents (with raw samples)
+    # are held in memory at once, whatever the size of the history.
+    return audio_clips_collection.find({"user_id": user_id}).batch_size(settings.EXPORT_BATCH_SIZE)
+
+async def export_ndjson(user_id: str) -> AsyncIterator[bytes]:
+    buffer = bytearray()
+    async for doc in _export_cursor(user_id):
+        buffer += orjson.dumps(serialize_clip(doc))
+        buffer += b"\n"
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink for ZipFile; written bytes are drained by the exporter.
+
+    Not seekable, so ZipFile writes entries with data descriptors and never
+    needs to go back and patch headers.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+def _encode_wav(audio_data) -> bytes:
+    audio = np.clip(np.nan_to_num(np.asarray(audio_data, dtype=np.float32)), -1.0, 1.0)
+    out = io.BytesIO()
+    sf.write(out, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return out.getvalue()
+
+async def export_zip(user_id: str) -> AsyncIterator[bytes]:
+    """Stream a zip of one WAV per clip plus metadata.csv.
+
+    Only one clip's samples are in memory at a time; metadata rows are
+    spooled to a temp file until the end. The zip central directory (a few
+    dozen bytes per entry) is the only state that grows with history size.
+    """
+    sink = _ZipStream()
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="") as metadata:
+        writer = csv.DictWriter(metadata, fieldnames=METADATA_FIELDS)
+        writer.writeheader()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+            async for doc in _export_cursor(user_id):
+                clip_id = str(doc["_id"])
+                audio_data = doc.get("audio_data")
+                wav_file = ""
+                if audio_data:
+                    wav_file = f"audio/{clip_id}.wav"
+                    zf.writestr(wav_file, _encode_wav(audio_data))
+                writer.writerow({
+                    "id": clip_id,
+                    "wav_file": wav_file,
+                    "emotion": doc.get("emotion"),
+                    "model_version": doc.get("model_version"),
+                    "emotion_source": doc.get("emotion_source"),
+                    "timestamp": doc.get("timestamp"),
+                    "created_at": doc["created_at"].isoformat() if doc.get("created_at") else None,
+                    "notes": doc.get("notes"),
+                    "youtube_url": doc.get("youtube_url"),
+                    "samples": len(audio_data) if audio_data else 0,
+                })
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+
+            metadata.seek(0)
+            with zf.open("metadata.csv", "w") as entry:
+                while True:
+                    text = metadata.read(STREAM_CHUNK_SIZE)
+                    if not text:
+                        break
+                    entry.write(text.encode("utf-8"))
+                    chunk = sink.drain()
+                    if chunk:
+                        yield chunk
+        yield sink.drain()
@@ -0,0 +1,100 @@
+"""
+On-disk cache of the CNN's normalized 128x128 log-mel input per clip.
+
+Features are grouped into shards: ``shard-<id>.npy`` holds an (N, 128, 128)
+float16 array (32 KB per clip) and ``shard-<id>.ids.json`` the clip ids of
+its rows. The ids file is written last, so a shard without one is
+incomplete and ignored. Shard names are ObjectIds, so several API processes
+and the rescoring job can add shards to the same directory without
+coordination.
+
+Shards live under ``<FEATURE_CACHE_DIR>/<FEATURE_VERSION>``. Changing how
+features are computed (and bumping FEATURE_VERSION) starts a fresh cache
+instead of mixing incompatible tensors. Readers memory-map the shards, so
+rescoring streams them from disk without decoding audio or running an STFT.
+"""
+
+import asyncio
+import glob
+import json
+import os
+from typing import Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from core.config import settings
+from improved_inference import FEATURE_VERSION
+
+def cache_dir(root: str) -> str:
+    return os.path.join(root, FEATURE_VERSION)
+
+def _replace_atomically(path: str, write):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+def write_shard(root: str, ids: List[str], mels: List[np.ndarray]) -> Optional[str]:
+    """Write one shard of features; returns its path."""
+    if not ids:
+        return None
+    directory = cache_dir(root)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"shard-{ObjectId()}")
+    array = np.stack(mels).astype(np.float16)
+    _replace_atomically(base + ".npy", lambda f: np.save(f, array))
+    _replace_atomically(base + ".ids.json", lambda f: f.write(json.dumps(ids).encode()))
+    return base + ".npy"
+
+def iter_shards(root: str) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """(clip ids, memory-mapped float16 features) for every complete shard, oldest first."""
+    for ids_path in sorted(glob.glob(os.path.join(cache_dir(root), "shard-*.ids.json"))):
+        with open(ids_path) as f:
+            ids = json.load(f)
+        features = np.load(ids_path[:-len(".ids.json")] + ".npy", mmap_mode="r")
+        yield ids, features
+
+def cached_ids(root: str) -> Set[str]:
+    ids: Set[str] = set()
+    for shard_ids, _ in iter_shards(root):
+        ids.update(shard_ids)
+    return ids
+
+class FeatureCacheWriter:
+    """Collects (clip id, mel) pairs and writes them out a shard at a time."""
+
+    def __init__(self, root: str, shard_size: int = 1024):
+        self.root = root
+        self.shard_size = shard_size
+        self._ids: List[str] = []
+        self._mels: List[np.ndarray] = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, clip_id: str, mel: np.ndarray) -> Optional[Tuple[List[str], List[np.ndarray]]]:
+        """Buffer one clip; returns a full shard's worth (for ``write_shard``) once there is one."""
+        self._ids.append(clip_id)
+        self._mels.append(np.asarray(mel, dtype=np.float16))
+        if len(self._ids) >= self.shard_size:
+            return self.take()
+        return None
+
+    def take(self) -> Tuple[List[str], List[np.ndarray]]:
+        batch = (self._ids, self._mels)
+        self._ids, self._mels = [], []
+        return batch
+
+    def flush(self) -> Optional[str]:
+        return write_shard(self.root, *self.take())
+
+# Features of clips saved through the API, written when FEATURE_CACHE_ON_SAVE is set
+clip_features = FeatureCacheWriter(settings.FEATURE_CACHE_DIR, settings.FEATURE_CACHE_SHARD_SIZE)
+
+async def cache_clip_features(clip_id, mel: Optional[np.ndarray]):
+    if not settings.FEATURE_CACHE_ON_SAVE or mel is None:
+        return
+    shard = clip_features.add(str(clip_id), mel)
+    if shard is not None:
+        await asyncio.to_thread(write_shard, settings.FEATURE_CACHE_DIR, *shard)
@@ -0,0 +1,240 @@
+"""
+Staged prediction pipeline: decode -> features -> model.
+
+Each stage has its own bounded queue and its own thread pool, so decoding
+request N+1 overlaps with mel extraction and the forward pass of request N
+instead of running back to back in one call. A full queue blocks the
+upstream stage (backpressure) rather than buffering without limit, and the
+model stage drains whatever is queued into one batched forward pass.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+
+from core.config import settings
+from core.services.audio_service import clean_audio, load_audio_file
+from improved_inference import extract_features, predict_from_features
+
+logger = logging.getLogger(__name__)
+
+class AudioDecodeError(Exception):
+    pass
+
+class _Job:
+    __slots__ = ("payload", "with_embedding", "future")
+
+    def __init__(self, payload, with_embedding: bool, future: asyncio.Future):
+        self.payload = payload
+        self.with_embedding = with_embedding
+        self.future = future
+
+class PipelineStoppedError(RuntimeError):
+    pass
+
+class Stage:
+    """One pipeline step: a bounded input queue served by ``workers`` threads.
+
+    ``fn`` takes a list of jobs and returns one result per job; ``batch_size``
+    caps how many queued jobs a worker takes at once. The queue and thread
+    pool are created in ``start`` so a stage can be stopped and started
+    again on a new event loop.
+    """
+
+    def __init__(self, name: str, fn: Callable[[List[_Job]], List[Any]], workers: int,
+                 queue_size: int, batch_size: int = 1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.next: Optional["Stage"] = None
+        self.tasks: List[asyncio.Task] = []
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.started_at = time.perf_counter()
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.busy_time = 0.0
+        self.blocked_time = 0.0
+        self.max_depth = 0
+
+    @property
+    def running(self) -> bool:
+        return self.queue is not None
+
+    async def put(self, job: _Job):
+        if not self.running:
+            raise PipelineStoppedError(f"Pipeline stage '{self.name}' is not running")
+        # Time spent waiting here is backpressure from this stage
+        start = time.perf_counter()
+        await self.queue.put(job)
+        self.blocked_time += time.perf_counter() - start
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            while len(jobs) < self.batch_size and not self.queue.empty():
+                jobs.append(self.queue.get_nowait())
+            jobs = [job for job in jobs if not job.future.done()]  # caller gave up
+            if not jobs:
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.fn, jobs)
+                self.processed += len(jobs)
+                for job, result in zip(jobs, results):
+                    job.payload = result
+                    if self.next is None:
+                        if not job.future.done():
+                            job.future.set_result(result)
+                    else:
+                        await self.next.put(job)
+            except asyncio.CancelledError:
+                _fail(jobs, PipelineStoppedError("Prediction pipeline stopped"))
+                raise
+            except Exception as e:
+                self.failed += len(jobs)
+                _fail(jobs, e)
+            finally:
+                self.busy_time += time.perf_counter() - start
+                self.batches += 1
+
+    def _spawn_worker(self):
+        task = asyncio.create_task(self._worker())
+        task.add_done_callback(self._on_worker_done)
+        self.tasks.append(task)
+
+    def _on_worker_done(self, task: asyncio.Task):
+        if task in self.tasks:
+            self.tasks.remove(task)
+        if task.cancelled():
+            return
+        # A worker only ends on its own if something outside fn broke (e.g.
+        # the queue belongs to another loop); don't leave callers waiting
+        logger.error(f"Pipeline stage '{self.name}' worker died: {task.exception()!r}")
+        self._fail_queued(task.exception())
+        if self.running:
+            self._spawn_worker()
+
+    def _fail_queued(self, error: BaseException):
+        while self.queue is not None and not self.queue.empty():
+            _fail([self.queue.get_nowait()], error)
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"pipeline-{self.name}")
+        self._reset_stats()
+        for _ in range(self.workers):
+            self._spawn_worker()
+
+    async def stop(self):
+        tasks, self.tasks = self.tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._fail_queued(PipelineStoppedError("Prediction pipeline stopped"))
+        self.queue = None
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> dict:
+        uptime = max(time.perf_counter() - self.started_at, 1e-9)
+        return {
+            "workers": len(self.tasks),
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "queue_capacity": self.queue_size,
+            "max_queue_depth": self.max_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "avg_batch": (self.processed + self.failed) / self.batches if self.batches else None,
+            "utilization": self.busy_time / (self.workers * uptime),
+            "backpressure_seconds": self.blocked_time,
+        }
+
+def _fail(jobs: List[_Job], error: BaseException):
+    for job in jobs:
+        if not job.future.done():
+            job.future.set_exception(error)
+
+class PredictionPipeline:
+    def __init__(self, stages: List[Stage], timeout: float = 60.0):
+        self.stages = stages
+        self.timeout = timeout
+        for upstream, downstream in zip(stages, stages[1:]):
+            upstream.next = downstream
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    async def stop(self):
+        for stage in self.stages:
+            await stage.stop()
+
+    async def submit(self, payload, with_embedding: bool = False):
+        """Run one clip (array/list of samples, or a path to decode) through all stages.
+
+        Raises ``asyncio.TimeoutError`` if the clip isn't through within
+        ``timeout`` seconds, including time spent waiting for queue space.
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        async def run():
+            await self.stages[0].put(_Job(payload, with_embedding, future))
+            return await future
+
+        try:
+            return await asyncio.wait_for(run(), timeout=self.timeout)
+        finally:
+            # Workers skip jobs whose caller has given up
+            if not future.done():
+                future.cancel()
+
+    def stats(self) -> dict:
+        return {stage.name: stage.stats() for stage in self.stages}
+
+def _decode(jobs: List[_Job]):
+    results = []
+    for job in jobs:
+        try:
+            if isinstance(job.payload, str):
+                results.append(load_audio_file(job.payload))
+            else:
+                results.append(clean_audio(np.asarray(job.payload, dtype=np.float32)))
+        except Exception as e:
+            raise AudioDecodeError(str(e)) from e
+    return results
+
+def _features(jobs: List[_Job]):
+    return [extract_features(job.payload, use_cascade=not job.with_embedding) for job in jobs]
+
+def _model(jobs: List[_Job]):
+    results: List[Any] = [None] * len(jobs)
+    for with_embedding in (False, True):
+        group = [i for i, job in enumerate(jobs) if job.with_embedding == with_embedding]
+        if group:
+            predictions = predict_from_features([jobs[i].payload for i in group], with_embeddings=with_embedding)
+            for i, prediction in zip(group, predictions):
+                results[i] = prediction
+    return results
+
+def build_prediction_pipeline() -> PredictionPipeline:
+    queue_size = settings.PIPELINE_QUEUE_SIZE
+    return PredictionPipeline([
+        Stage("decode", _decode, settings.PIPELINE_DECODE_WORKERS, queue_size),
+        Stage("features", _features, settings.PIPELINE_FEATURE_WORKERS, queue_size),
+        Stage("model", _model, settings.PIPELINE_MODEL_WORKERS, queue_size, batch_size=settings.PIPELINE_MODEL_BATCH),
+    ], timeout=settings.PIPELINE_TIMEOUT)
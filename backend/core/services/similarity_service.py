@@ -0,0 +1,138 @@
+import asyncio
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import Binary
+
+from core.config import settings
+from core.db.mongo import audio_clips_collection
+
+EMBEDDING_DIM = 128
+
+def encode_embedding(vector: np.ndarray) -> Binary:
+    """Compact float16 bytes for storage on the clip document (256 bytes)."""
+    return Binary(np.asarray(vector, dtype=np.float16).tobytes())
+
+def decode_embedding(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype=np.float16).astype(np.float32)
+
+def embedding_fields(prediction) -> dict:
+    """Clip document fields for a prediction's embedding, if it has one."""
+    if prediction is None or prediction.embedding is None:
+        return {}
+    return {"embedding": encode_embedding(prediction.embedding), "embedding_version": prediction.model_version}
+
+class UserEmbeddingIndex:
+    """Unit-normalized embeddings of one user's clips for cosine top-k.
+
+    Stored as float32 in memory so the scan is a single BLAS mat-vec; rows
+    grow by doubling so inserts are amortized O(1).
+    """
+
+    def __init__(self, version: str, capacity: int = 256):
+        self.version = version
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.matrix = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def add(self, clip_id: str, vector: np.ndarray):
+        if clip_id in self.rows:
+            return
+        if len(self.ids) == len(self.matrix):
+            grown = np.zeros((len(self.matrix) * 2, EMBEDDING_DIM), dtype=np.float32)
+            grown[:len(self.ids)] = self.matrix
+            self.matrix = grown
+        norm = np.linalg.norm(vector)
+        self.matrix[len(self.ids)] = vector / norm if norm > 0 else vector
+        self.rows[clip_id] = len(self.ids)
+        self.ids.append(clip_id)
+
+    def query(self, clip_id: str, k: int) -> Optional[List[Tuple[str, float]]]:
+        row = self.rows.get(clip_id)
+        if row is None:
+            return None
+        scores = self.matrix[:len(self.ids)] @ self.matrix[row]
+        scores[row] = -np.inf  # never return the query clip itself
+        k = min(k, len(self.ids) - 1)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[i], float(scores[i])) for i in top]
+
+class EmbeddingIndexCache:
+    """Per-user indexes loaded lazily from audio_clips, LRU-bounded by index
+    count and by the total size of their matrices.
+
+    An index only holds embeddings produced by one model version, so each
+    (user, version) pair gets its own. Until rescore_clips.py re-embeds old
+    clips after a model swap, a user may have clips under two versions;
+    each is compared only with clips embedded by the same model. The index
+    in use is never evicted, so one user larger than ``max_bytes`` still
+    gets served; it just leaves no room for anyone else.
+    """
+
+    def __init__(self, max_users: int, max_bytes: int):
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._indexes: "OrderedDict[Tuple[str, str], UserEmbeddingIndex]" = OrderedDict()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _evict(self, keep: Tuple[str, str]):
+        while len(self._indexes) > 1 and (len(self._indexes) > self.max_users or self.nbytes > self.max_bytes):
+            evicted = next(iter(self._indexes))
+            if evicted == keep:
+                self._indexes.move_to_end(keep)
+                evicted = next(iter(self._indexes))
+            self.nbytes -= self._indexes.pop(evicted).nbytes
+            self._locks.pop(evicted, None)
+
+    async def _load(self, user_id: str, version: str) -> UserEmbeddingIndex:
+        index = UserEmbeddingIndex(version)
+        cursor = audio_clips_collection.find(
+            {"user_id": user_id, "embedding": {"$exists": True}, "embedding_version": version},
+            {"embedding": 1},
+        ).batch_size(5000)
+        async for doc in cursor:
+            index.add(str(doc["_id"]), decode_embedding(doc["embedding"]))
+        return index
+
+    async def get(self, user_id: str, version: str) -> UserEmbeddingIndex:
+        key = (user_id, version)
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+            return index
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = await self._load(user_id, version)
+                self._indexes[key] = index
+                self.nbytes += index.nbytes
+                self._evict(keep=key)
+            self._indexes.move_to_end(key)
+            return index
+
+    def on_insert(self, user_id: str, clip_id: str, vector: np.ndarray, version: str):
+        # Only indexes already in memory need updating; others load it from Mongo later
+        key = (user_id, version)
+        index = self._indexes.get(key)
+        if index is not None:
+            before = index.nbytes
+            index.add(clip_id, np.asarray(vector, dtype=np.float32))
+            if index.nbytes != before:
+                self.nbytes += index.nbytes - before
+                self._evict(keep=key)
+
+embedding_indexes = EmbeddingIndexCache(settings.SIMILARITY_CACHE_USERS, settings.SIMILARITY_CACHE_MB * 1024 * 1024)
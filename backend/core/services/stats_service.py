@@ -0,0 +1,120 @@
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from core.db.mongo import audio_clips_collection, emotion_stats_collection
+
+# Rollup documents look like
+#   {"user_id": "...", "day": "2024-05-01", "counts": {"happy": 3, "sad": 1}, "total": 4}
+# with days bucketed in UTC.
+
+def _day(created_at: datetime) -> str:
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.strftime("%Y-%m-%d")
+
+def _count_key(emotion: Optional[str]) -> str:
+    # Emotion labels can be user supplied; keep them usable as field names.
+    # _COUNT_KEY_EXPR below must stay in step with this.
+    return (emotion or "unknown").replace(".", "_").lstrip("$") or "unknown"
+
+# _count_key as an aggregation expression, so rebuilt rollups use the same
+# keys as the incremental $inc path ("$" is a field path unless $literal)
+_COUNT_KEY_EXPR = {"$let": {
+    "vars": {"key": {"$ltrim": {
+        "input": {"$replaceAll": {"input": {"$ifNull": ["$emotion", ""]}, "find": ".", "replacement": "_"}},
+        "chars": {"$literal": "$"},
+    }}},
+    "in": {"$cond": [{"$eq": ["$$key", ""]}, "unknown", "$$key"]},
+}}
+
+async def ensure_stats_indexes():
+    await emotion_stats_collection.create_index([("user_id", 1), ("day", 1)], unique=True)
+
+async def record_emotions(docs: List[dict]):
+    """Count newly saved clips in the rollups, with one $inc per (user, day)."""
+    increments: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for doc in docs:
+        inc = increments[(doc["user_id"], _day(doc["created_at"]))]
+        inc[f"counts.{_count_key(doc.get('emotion'))}"] += 1
+        inc["total"] += 1
+    for (user_id, day), inc in increments.items():
+        await emotion_stats_collection.update_one({"user_id": user_id, "day": day}, {"$inc": dict(inc)}, upsert=True)
+
+async def record_relabels(changes: List[Tuple[str, datetime, Optional[str], Optional[str]]]):
+    """Move clips between emotion counts after relabeling.
+
+    ``changes`` holds (user_id, created_at, old emotion, new emotion) per
+    clip. Totals are unchanged; days without a rollup row are left alone.
+    """
+    deltas: Dict[Tuple[str, str], Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for user_id, created_at, old, new in changes:
+        delta = deltas[(user_id, _day(created_at))]
+        delta[f"counts.{_count_key(old)}"] -= 1
+        delta[f"counts.{_count_key(new)}"] += 1
+    for (user_id, day), delta in deltas.items():
+        inc = {key: n for key, n in delta.items() if n}
+        if inc:
+            await emotion_stats_collection.update_one({"user_id": user_id, "day": day}, {"$inc": inc})
+
+async def get_emotion_stats(user_id: str, days: int = 30) -> dict:
+    since = _day(datetime.now(timezone.utc) - timedelta(days=days - 1))
+    cursor = emotion_stats_collection.find(
+        {"user_id": user_id, "day": {"$gte": since}},
+        {"_id": 0, "day": 1, "counts": 1, "total": 1},
+    ).sort("day", 1)
+
+    daily = []
+    totals = {}
+    async for doc in cursor:
+        daily.append(doc)
+        for emotion, n in doc.get("counts", {}).items():
+            totals[emotion] = totals.get(emotion, 0) + n
+    return {"days": daily, "totals": totals, "total": sum(totals.values())}
+
+def rebuild_pipeline(user_id: Optional[str] = None) -> list:
+    match = {"created_at": {"$exists": True}}
+    if user_id:
+        match["user_id"] = user_id
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "emotion": _COUNT_KEY_EXPR,
+            },
+            "n": {"$sum": 1},
+        }},
+        {"$group": {
+            "_id": {"user_id": "$_id.user_id", "day": "$_id.day"},
+            "counts": {"$push": {"k": "$_id.emotion", "v": "$n"}},
+            "total": {"$sum": "$n"},
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "day": "$_id.day",
+            "counts": {"$arrayToObject": "$counts"},
+            "total": 1,
+        }},
+        {"$merge": {
+            "into": emotion_stats_collection.name,
+            "on": ["user_id", "day"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert",
+        }},
+    ]
+
+async def rebuild_emotion_stats(user_id: Optional[str] = None) -> int:
+    """Recompute rollups from audio_clips server-side.
+
+    Clips written while a rebuild runs may be counted twice or missed, so
+    run it during quiet periods (or per user).
+    """
+    await ensure_stats_indexes()
+    await emotion_stats_collection.delete_many({"user_id": user_id} if user_id else {})
+    cursor = audio_clips_collection.aggregate(rebuild_pipeline(user_id))
+    async for _ in cursor:
+        pass
+    return await emotion_stats_collection.count_documents({"user_id": user_id} if user_id else {})
@@ -5,6 +5,14 @@ import torch.nn as nn
 import numpy as np
 import librosa
 import os
+import time
+import random
+import hashlib
+import logging
+import queue
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
 
 # === Model architecture ===
 class SEBlock(nn.Module):
@@ -69,7 +77,7 @@ class EmotionCNN(nn.Module):
             nn.Linear(128, num_classes)
         )
 
-    def forward(self, x):
+    def _pooled_features(self, x):
         x = self.conv1(x)
         if self.use_se:
             x = self.se1(x)
@@ -83,49 +91,390 @@ class EmotionCNN(nn.Module):
         if self.use_se:
             x = self.se4(x)
         x = self.global_pool(x)
-        x = x.view(x.size(0), -1)
-        return self.classifier(x)
+        return x.view(x.size(0), -1)
+
+    def forward(self, x):
+        return self.classifier(self._pooled_features(x))
+
+    def forward_with_embedding(self, x):
+        """Logits plus the 128-d penultimate activation (after the hidden ReLU)."""
+        embedding = self.classifier[:3](self._pooled_features(x))
+        return self.classifier[3:](embedding), embedding
+
+logger = logging.getLogger(__name__)
 
 # === Constants ===
 SAMPLE_RATE = 22050
 DURATION = 3  # seconds
 N_MELS = 128
 TARGET_LENGTH = SAMPLE_RATE * DURATION
+# Identifies compute_mel_db's output; bump when feature extraction changes
+# so cached features (core/services/feature_cache.py) are not reused
+FEATURE_VERSION = f"mel{N_MELS}-sr{SAMPLE_RATE}-{DURATION}s-v1"
+DEFAULT_EMOTIONS = ['neutral', 'calm', 'happy', 'sad', 'angry', 'fearful', 'disgust', 'surprised']
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.dirname(os.path.abspath(__file__)))
+MODEL_PATH = os.getenv("MODEL_PATH", os.path.join(MODEL_DIR, "improved_emotion_recognition_model.pth"))
+CASCADE_PATH = os.getenv("CASCADE_PATH", os.path.join(MODEL_DIR, "cascade_stage1.npz"))
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() in ("1", "true", "yes")
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "4"))
 
-# === Model + Label Encoder Loading ===
-try:
-    model_path = os.path.join(os.path.dirname(__file__), "improved_emotion_recognition_model.pth")
+# === Model Loading ===
+@dataclass
+class LoadedModel:
+    version: str
+    path: str
+    model: EmotionCNN
+    emotions: List[str]
+    label_encoder: object = None
+    loaded_at: float = 0.0
+
+def _checkpoint_version(path: str, checkpoint: dict) -> str:
+    if checkpoint.get("version"):
+        return str(checkpoint["version"])
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:8]
+    return f"{os.path.splitext(os.path.basename(path))[0]}-{digest}"
+
+def load_model(path: str, version: Optional[str] = None) -> LoadedModel:
+    """Load a checkpoint and run a warm-up pass so the first request isn't slow."""
     # weights_only=False needed because we load label_encoder (sklearn object)
     # This is safe since we control the model file source
-    checkpoint = torch.load(model_path, map_location=torch.device("cpu"), weights_only=False)
-    model = EmotionCNN(num_classes=8, use_se=True)
+    checkpoint = torch.load(path, map_location=torch.device("cpu"), weights_only=False)
+    label_encoder = checkpoint.get("label_encoder", None)
+    emotions = label_encoder.classes_.tolist() if label_encoder else list(DEFAULT_EMOTIONS)
+    config = checkpoint.get("model_config", {})
+    model = EmotionCNN(num_classes=config.get("num_classes", len(emotions)), use_se=config.get("use_se", True))
     model.load_state_dict(checkpoint['model_state_dict'])
     model.eval()
-    label_encoder = checkpoint.get("label_encoder", None)
-    EMOTIONS = label_encoder.classes_.tolist() if label_encoder else ['neutral', 'calm', 'happy', 'sad', 'angry', 'fearful', 'disgust', 'surprised']
+    with torch.no_grad():
+        model(torch.zeros(1, 1, N_MELS, 128))
+    return LoadedModel(
+        version=version or _checkpoint_version(path, checkpoint),
+        path=path,
+        model=model,
+        emotions=emotions,
+        label_encoder=label_encoder,
+        loaded_at=time.time(),
+    )
+
+# === Model Registry ===
+class ShadowStats:
+    """Agreement and latency of the shadow model against the active one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.samples = 0
+            self.agreements = 0
+            self.active_time = 0.0
+            self.shadow_time = 0.0
+            self.errors = 0
+            self.dropped = 0
+
+    def record(self, n: int, agreements: int, active_time: float, shadow_time: float):
+        with self._lock:
+            self.samples += n
+            self.agreements += agreements
+            self.active_time += active_time
+            self.shadow_time += shadow_time
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_dropped(self):
+        with self._lock:
+            self.dropped += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            n = self.samples or 1
+            return {
+                "samples": self.samples,
+                "agreement": self.agreements / n if self.samples else None,
+                "active_ms_per_clip": 1000 * self.active_time / n if self.samples else None,
+                "shadow_ms_per_clip": 1000 * self.shadow_time / n if self.samples else None,
+                "errors": self.errors,
+                "dropped": self.dropped,
+            }
+
+class ModelRegistry:
+    """Holds the active model and an optional shadow candidate.
+
+    Swaps are a single attribute assignment: callers grab ``active`` once per
+    request, so in-flight work finishes on the model it started with while
+    new requests pick up the replacement.
+    """
+
+    def __init__(self, active: LoadedModel):
+        self.active = active
+        self.shadow: Optional[LoadedModel] = None
+        self.shadow_sample_rate = 0.0
+        self.shadow_stats = ShadowStats()
+        self.loading: Optional[dict] = None
+        self.last_error: Optional[str] = None
+        self._load_lock = threading.Lock()
+        # A single thread scores shadow samples off the request path (its
+        # forward passes still use torch's intra-op threads). The queue is
+        # bounded: each entry holds a mel batch, so when the shadow model
+        # falls behind, samples are dropped instead of piling up in memory
+        self._shadow_queue: queue.Queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self._shadow_thread: Optional[threading.Thread] = None
+        self._shadow_lock = threading.Lock()
+
+    def load(self, path: str, version: Optional[str] = None, shadow: bool = False,
+             sample_rate: float = 0.1) -> LoadedModel:
+        with self._load_lock:
+            self.loading = {"path": path, "version": version, "shadow": shadow, "started_at": time.time()}
+            try:
+                candidate = load_model(path, version)
+            except Exception as e:
+                self.last_error = f"Failed to load {path}: {e}"
+                logger.error(self.last_error)
+                raise
+            finally:
+                self.loading = None
+            self.last_error = None
+            if shadow:
+                self.shadow_stats.reset()
+                self.shadow_sample_rate = sample_rate
+                self.shadow = candidate
+                logger.info(f"Shadow model {candidate.version} loaded (sample rate {sample_rate})")
+            else:
+                previous = self.active
+                self.active = candidate
+                logger.info(f"Active model swapped {previous.version} -> {candidate.version}")
+            return candidate
+
+    def load_in_background(self, path: str, version: Optional[str] = None, shadow: bool = False,
+                           sample_rate: float = 0.1) -> threading.Thread:
+        def run():
+            try:
+                self.load(path, version, shadow, sample_rate)
+            except Exception:
+                pass  # recorded in last_error
+        self.loading = {"path": path, "version": version, "shadow": shadow, "started_at": time.time()}
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
+    def promote_shadow(self) -> LoadedModel:
+        if self.shadow is None:
+            raise ValueError("No shadow model loaded")
+        previous, self.active = self.active, self.shadow
+        self.shadow = None
+        logger.info(f"Shadow model promoted {previous.version} -> {self.active.version}")
+        return self.active
+
+    def clear_shadow(self):
+        self.shadow = None
+
+    def status(self) -> dict:
+        return {
+            "active": {"version": self.active.version, "path": self.active.path, "loaded_at": self.active.loaded_at},
+            "shadow": {
+                "version": self.shadow.version,
+                "path": self.shadow.path,
+                "sample_rate": self.shadow_sample_rate,
+                "stats": self.shadow_stats.summary(),
+            } if self.shadow else None,
+            "loading": self.loading,
+            "last_error": self.last_error,
+        }
+
+    def predict_mels(self, mel_batch: torch.Tensor):
+        """Run the active model on a mel batch; returns (probabilities, LoadedModel)."""
+        handle = self.active
+        start = time.perf_counter()
+        with torch.no_grad():
+            probs = torch.softmax(handle.model(mel_batch), dim=1).numpy()
+        elapsed = time.perf_counter() - start
+
+        shadow = self.shadow
+        if shadow is not None and random.random() < self.shadow_sample_rate:
+            self._submit_shadow((shadow, handle, mel_batch, probs, elapsed))
+        return probs, handle
+
+    def _submit_shadow(self, job: tuple):
+        try:
+            self._shadow_queue.put_nowait(job)
+        except queue.Full:
+            self.shadow_stats.record_dropped()
+            return
+        if self._shadow_thread is None or not self._shadow_thread.is_alive():
+            with self._shadow_lock:
+                if self._shadow_thread is None or not self._shadow_thread.is_alive():
+                    self._shadow_thread = threading.Thread(target=self._shadow_worker, name="shadow-model",
+                                                           daemon=True)
+                    self._shadow_thread.start()
+
+    def _shadow_worker(self):
+        while True:
+            self._score_shadow(*self._shadow_queue.get())
+
+    def predict_mels_with_embeddings(self, mel_batch: torch.Tensor):
+        """Like predict_mels but also returns penultimate embeddings; skips shadow scoring."""
+        handle = self.active
+        with torch.no_grad():
+            logits, embeddings = handle.model.forward_with_embedding(mel_batch)
+            probs = torch.softmax(logits, dim=1).numpy()
+        return probs, embeddings.numpy(), handle
+
+    def _score_shadow(self, shadow: LoadedModel, handle: LoadedModel, mel_batch, active_probs, active_time):
+        try:
+            start = time.perf_counter()
+            with torch.no_grad():
+                shadow_idx = torch.argmax(shadow.model(mel_batch), dim=1).tolist()
+            shadow_time = time.perf_counter() - start
+            active_labels = [handle.emotions[i] for i in active_probs.argmax(axis=1)]
+            shadow_labels = [shadow.emotions[i] for i in shadow_idx]
+            agreements = sum(a == b for a, b in zip(active_labels, shadow_labels))
+            self.shadow_stats.record(len(shadow_labels), agreements, active_time, shadow_time)
+        except Exception as e:
+            logger.warning(f"Shadow model {shadow.version} failed: {e}")
+            self.shadow_stats.record_error()
+
+try:
+    registry = ModelRegistry(load_model(MODEL_PATH, os.getenv("MODEL_VERSION") or None))
 except Exception as e:
     raise RuntimeError(f"Failed to load model: {e}")
 
+# Labels of the model loaded at startup; use registry.active.emotions for the live set
+EMOTIONS = registry.active.emotions
+label_encoder = registry.active.label_encoder
+
 # === Mel Spectrogram Processing ===
-def get_mel_spectrogram(audio):
+def compute_mel_db(audio) -> np.ndarray:
+    """Normalized 128x128 log-mel feature the CNN is trained on."""
     mel_spec = librosa.feature.melspectrogram(y=audio, sr=SAMPLE_RATE, n_mels=N_MELS, n_fft=2048, hop_length=512)
     mel_db = librosa.power_to_db(mel_spec, ref=np.max)
     mel_db = (mel_db - mel_db.mean()) / (mel_db.std() + 1e-8)
-    mel_db = np.resize(mel_db, (128, 128))  # Resize to match training
-    mel_tensor = torch.tensor(mel_db).unsqueeze(0).unsqueeze(0).float()
+    return np.resize(mel_db, (128, 128))  # Resize to match training
+
+def get_mel_spectrogram(audio):
+    mel_tensor = torch.tensor(compute_mel_db(audio)).unsqueeze(0).unsqueeze(0).float()
     return mel_tensor
 
-# === Prediction Function ===
-def predict_emotion_improved(audio_array: np.ndarray) -> str:
+def prepare_audio(audio_array: np.ndarray) -> np.ndarray:
     if len(audio_array) < TARGET_LENGTH:
-        audio_array = np.pad(audio_array, (0, TARGET_LENGTH - len(audio_array)), mode='constant')
-    else:
-        audio_array = audio_array[:TARGET_LENGTH]
+        return np.pad(audio_array, (0, TARGET_LENGTH - len(audio_array)), mode='constant')
+    return audio_array[:TARGET_LENGTH]
 
-    mel_tensor = get_mel_spectrogram(audio_array)
+# === Cascade (cheap first stage) ===
+def stage1_features(audio: np.ndarray, mel_db: np.ndarray) -> np.ndarray:
+    """Pooled statistics for the cascade's first stage.
 
-    with torch.no_grad():
-        output = model(mel_tensor)
-        pred_idx = torch.argmax(output, dim=1).item()
+    Per-band mean/std of the CNN's mel input plus frame energy and
+    zero-crossing statistics; all cheap once the mel is computed.
+    """
+    frames = audio[:len(audio) // 512 * 512].reshape(-1, 512)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-10)
+    zcr = np.mean(np.abs(np.diff(np.sign(frames), axis=1)) > 0, axis=1)
+    return np.concatenate([
+        mel_db.mean(axis=1),
+        mel_db.std(axis=1),
+        [energy.mean(), energy.std(), energy.max(), zcr.mean(), zcr.std()],
+    ]).astype(np.float32)
+
+class CascadeClassifier:
+    """Softmax-linear first stage trained offline by train_cascade.py."""
+
+    def __init__(self, path: str, threshold: Optional[float] = None):
+        params = np.load(path, allow_pickle=False)
+        self.path = path
+        self.mean = params["mean"]
+        self.scale = params["scale"]
+        self.weights = params["weights"]
+        self.bias = params["bias"]
+        self.classes = [str(c) for c in params["classes"]]
+        self.version = str(params["version"])
+        self.threshold = threshold if threshold is not None else float(params["threshold"])
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        logits = ((features - self.mean) / self.scale) @ self.weights.T + self.bias
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+cascade: Optional[CascadeClassifier] = None
+if CASCADE_ENABLED:
+    try:
+        threshold = os.getenv("CASCADE_THRESHOLD")
+        cascade = CascadeClassifier(CASCADE_PATH, float(threshold) if threshold else None)
+        logger.info(f"Cascade stage 1 {cascade.version} enabled (threshold {cascade.threshold})")
+    except Exception as e:
+        logger.warning(f"Cascade disabled, failed to load {CASCADE_PATH}: {e}")
+
+@dataclass
+class Prediction:
+    emotion: str
+    model_version: str
+    probabilities: Optional[np.ndarray] = None
+    confidence: Optional[float] = None
+    stage: str = "cnn"
+    embedding: Optional[np.ndarray] = None
+    mel: Optional[np.ndarray] = None  # CNN input, kept with embeddings so saved clips can cache it
+
+# === Prediction Functions ===
+@dataclass
+class ClipFeatures:
+    mel: np.ndarray
+    stage1: Optional[np.ndarray] = None
+
+def extract_features(audio_array: np.ndarray, use_cascade: bool = True) -> ClipFeatures:
+    """CPU feature work for one clip: pad/trim, log-mel and cascade statistics."""
+    prepared = prepare_audio(audio_array)
+    mel = compute_mel_db(prepared)
+    stage1 = stage1_features(prepared, mel) if use_cascade and cascade is not None else None
+    return ClipFeatures(mel, stage1)
+
+def predict_from_features(features: List[ClipFeatures], with_embeddings: bool = False) -> List[Prediction]:
+    """Answer confident clips from the cascade and the rest with a single
+    forward pass of the active model.
+
+    ``with_embeddings`` runs every clip through the CNN (bypassing the
+    cascade) and attaches its penultimate embedding.
+    """
+    if not features:
+        return []
+    predictions: List[Optional[Prediction]] = [None] * len(features)
+
+    stage1 = cascade if not with_embeddings else None
+    candidates = [i for i, f in enumerate(features) if f.stage1 is not None] if stage1 is not None else []
+    if candidates:
+        probs = stage1.predict_proba(np.stack([features[i].stage1 for i in candidates]))
+        for i, p in zip(candidates, probs):
+            confidence = float(p.max())
+            if confidence >= stage1.threshold:
+                predictions[i] = Prediction(stage1.classes[int(p.argmax())], stage1.version, None, confidence, "cascade")
+
+    remaining = [i for i, prediction in enumerate(predictions) if prediction is None]
+    if remaining:
+        mel_batch = torch.from_numpy(np.stack([features[i].mel for i in remaining])).float().unsqueeze(1)
+        if with_embeddings:
+            probs, embeddings, handle = registry.predict_mels_with_embeddings(mel_batch)
+        else:
+            (probs, handle), embeddings = registry.predict_mels(mel_batch), [None] * len(remaining)
+        for i, p, embedding in zip(remaining, probs, embeddings):
+            predictions[i] = Prediction(handle.emotions[int(p.argmax())], handle.version, p, float(p.max()), "cnn",
+                                        embedding, features[i].mel if with_embeddings else None)
+    return predictions
+
+def predict_batch(audio_arrays: List[np.ndarray], use_cascade: bool = True,
+                  with_embeddings: bool = False) -> List[Prediction]:
+    """Predict several clips in one call (see predict_from_features)."""
+    use_cascade = use_cascade and not with_embeddings
+    return predict_from_features([extract_features(audio, use_cascade) for audio in audio_arrays], with_embeddings)
+
+def predict_emotion_detailed(audio_array: np.ndarray, with_embedding: bool = False) -> Prediction:
+    return predict_batch([audio_array], with_embeddings=with_embedding)[0]
+
+def predict_emotion_improved(audio_array: np.ndarray) -> str:
+    return predict_emotion_detailed(audio_array).emotion
 
-    return EMOTIONS[pred_idx]
+def predict_emotions_batch(audio_arrays: List[np.ndarray]) -> List[str]:
+    """Predict emotions for several clips with a single forward pass."""
+    return [prediction.emotion for prediction in predict_batch(audio_arrays)]
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Closed-loop load generator for the Voice Emotion Detection API.
+
+Drives the ASGI app in-process (default) or a running server (--base-url)
+with a weighted mix of prediction, upload, batch, listing and YouTube
+traffic, ramping concurrency in steps. Each virtual user sends its next
+request as soon as the previous one returns. For every step and endpoint
+it reports throughput, p50/p95/p99 latency and error rate.
+
+In-process runs use the in-memory Mongo stand-in and a fake yt_dlp that
+"downloads" a synthetic clip, so no database or network is needed.
+
+    python load_test.py --steps 1,4,16 --step-duration 20
+    python load_test.py --mix predict=70,my_audio=30 --json before.json
+    python load_test.py --base-url http://localhost:8000 --mix predict=1
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+import types
+from collections import defaultdict
+
+DEFAULT_MIX = "predict=40,file=15,batch=10,files=5,my_audio=20,youtube=10"
+SAMPLE_RATE = 22050
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--step-duration", type=float, default=15.0, help="Seconds per concurrency step")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of unrecorded traffic before each step")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted endpoint mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--clip-seconds", type=float, default=3.0, help="Length of generated audio clips")
+    parser.add_argument("--batch-size", type=int, default=4, help="Clips per batch/multi-file request")
+    parser.add_argument("--seed-clips", type=int, default=50, help="Clips saved for the test user before starting")
+    parser.add_argument("--json", dest="json_out", help="Also write the report as JSON (for comparing runs)")
+    return parser.parse_args()
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix (choose from {', '.join(SCENARIOS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def make_clip(seconds: float, rng: random.Random):
+    import numpy as np
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * rng.uniform(100, 400) * t)
+    noise = 0.05 * np.random.default_rng(rng.randrange(1 << 30)).standard_normal(n)
+    return (tone + noise).astype(np.float32)
+
+def make_wav(audio) -> bytes:
+    import soundfile as sf
+    out = io.BytesIO()
+    sf.write(out, audio, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return out.getvalue()
+
+def install_fake_yt_dlp(wav_bytes: bytes):
+    """Replace yt_dlp with a stub that writes a canned WAV instead of downloading."""
+
+    class DownloadError(Exception):
+        pass
+
+    class YoutubeDL:
+        def __init__(self, opts=None):
+            self.opts = opts or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def extract_info(self, url, download=False):
+            return {"id": "fake", "duration": 3, "title": "load test"}
+
+        def download(self, urls):
+            path = self.opts["outtmpl"].replace("%(ext)s", "wav")
+            with open(path, "wb") as f:
+                f.write(wav_bytes)
+            return 0
+
+    module = types.ModuleType("yt_dlp")
+    module.YoutubeDL = YoutubeDL
+    module.utils = types.ModuleType("yt_dlp.utils")
+    module.utils.DownloadError = DownloadError
+    sys.modules["yt_dlp"] = module
+    sys.modules["yt_dlp.utils"] = module.utils
+
+# === Scenarios: each sends one request and returns the response ===
+
+async def scenario_predict(client, ctx):
+    return await client.post("/predict-emotion", json={"audio_data": ctx["clip_list"]})
+
+async def scenario_file(client, ctx):
+    return await client.post("/predict-emotion-file", files={"file": ("clip.wav", ctx["wav"], "audio/wav")})
+
+async def scenario_batch(client, ctx):
+    return await client.post("/predict-emotion-batch", json=[{"audio_data": ctx["clip_list"]}] * ctx["batch_size"])
+
+async def scenario_files(client, ctx):
+    files = [("files", (f"clip{i}.wav", ctx["wav"], "audio/wav")) for i in range(ctx["batch_size"])]
+    return await client.post("/predict-emotion-files", files=files)
+
+async def scenario_my_audio(client, ctx):
+    return await client.get("/my-audio", params={"limit": 20}, headers=ctx["auth"])
+
+async def scenario_youtube(client, ctx):
+    return await client.post("/predict-emotion-youtube", headers=ctx["auth"],
+                             json={"youtube_url": "https://www.youtube.com/watch?v=loadtest"})
+
+SCENARIOS = {
+    "predict": scenario_predict,
+    "file": scenario_file,
+    "batch": scenario_batch,
+    "files": scenario_files,
+    "my_audio": scenario_my_audio,
+    "youtube": scenario_youtube,
+}
+
+async def setup_user(client, ctx, seed_clips: int):
+    email = f"loadtest-{int(time.time())}@example.com"
+    await client.post("/api/signup", json={"email": email, "password": "loadtest", "name": "Load Test"})
+    response = await client.post("/api/login", json={"email": email, "password": "loadtest"})
+    response.raise_for_status()
+    ctx["auth"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    for _ in range(seed_clips):
+        await client.post("/save-audio", headers=ctx["auth"], json={"audio_data": ctx["clip_list"], "emotion": "neutral"})
+
+async def run_step(client, ctx, mix: dict, concurrency: int, duration: float, warmup: float):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    recording = False
+    deadline = time.perf_counter() + warmup + duration
+
+    async def virtual_user(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await SCENARIOS[name](client, ctx)
+                # Drain streamed bodies so latency covers the whole response
+                await response.aread()
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if recording:
+                samples[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+
+    async def start_recording():
+        nonlocal recording
+        await asyncio.sleep(warmup)
+        recording = True
+
+    step_start = time.perf_counter()
+    await asyncio.gather(start_recording(), *(virtual_user(i) for i in range(concurrency)))
+    measured = time.perf_counter() - step_start - warmup
+    return summarize(samples, errors, measured)
+
+def summarize(samples, errors, measured: float) -> dict:
+    import numpy as np
+    report = {}
+    for name in sorted(samples):
+        latencies = np.array(samples[name]) * 1000
+        report[name] = {
+            "requests": len(latencies),
+            "throughput_rps": len(latencies) / measured,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "error_rate": errors[name] / len(latencies),
+        }
+    total = sum(len(v) for v in samples.values())
+    report["_all"] = {"requests": total, "throughput_rps": total / measured,
+                      "error_rate": sum(errors.values()) / total if total else 0.0}
+    return report
+
+def print_step(concurrency: int, report: dict):
+    print(f"\n=== concurrency {concurrency} ===")
+    print(f"{'endpoint':<10} {'reqs':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for name, row in report.items():
+        if name == "_all":
+            continue
+        print(f"{name:<10} {row['requests']:>6} {row['throughput_rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['error_rate']:>6.1%}")
+    total = report["_all"]
+    print(f"{'total':<10} {total['requests']:>6} {total['throughput_rps']:>8.1f} "
+          f"{'':>9} {'':>9} {'':>9} {total['error_rate']:>6.1%}")
+
+async def run(args):
+    import httpx
+
+    mix = parse_mix(args.mix)
+    rng = random.Random(0)
+    clip = make_clip(args.clip_seconds, rng)
+    ctx = {"clip_list": clip.tolist(), "wav": make_wav(clip), "batch_size": args.batch_size, "auth": {}}
+
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=120)
+        lifespan = None
+    else:
+        os.environ["MONGO_URL"] = "memory://"
+        install_fake_yt_dlp(ctx["wav"])
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from app import app
+        # The YouTube route is rate limited per client IP, which would turn
+        # a load test into a 429 test
+        app.state.limiter.enabled = False
+        lifespan = app.router.lifespan_context(app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=120)
+
+    results = []
+    try:
+        await setup_user(client, ctx, args.seed_clips)
+        for concurrency in [int(c) for c in args.steps.split(",")]:
+            report = await run_step(client, ctx, mix, concurrency, args.step_duration, args.warmup)
+            print_step(concurrency, report)
+            results.append({"concurrency": concurrency, "endpoints": report})
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"mix": mix, "step_duration": args.step_duration, "steps": results}, f, indent=2)
+        print(f"\nReport written to {args.json_out}")
+
+def main():
+    args = parse_args()
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        raise SystemExit("load_test.py needs httpx: pip install httpx")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
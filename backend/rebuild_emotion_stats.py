@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-user daily emotion rollups from audio_clips.
+
+The rollups are kept up to date incrementally by the API; run this after
+bulk imports, relabeling, or to backfill history recorded before the
+rollups existed. Uses a server-side aggregation pipeline.
+
+    python rebuild_emotion_stats.py                 # all users
+    python rebuild_emotion_stats.py --user-id <id>  # one user
+"""
+
+import argparse
+import asyncio
+import time
+
+from core.services.stats_service import rebuild_emotion_stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    start = time.time()
+    rows = asyncio.run(rebuild_emotion_stats(args.user_id))
+    print(f"✅ Rebuilt {rows} daily rollup rows in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
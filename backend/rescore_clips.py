@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Relabel stored clips with a new model checkpoint from cached mel features.
+
+Clips missing from the feature cache (core/services/feature_cache.py) get
+their normalized 128x128 log-mel computed once from the stored audio_data
+and written to float16 shards. Clips the API cached on save
+(FEATURE_CACHE_ON_SAVE=true), including YouTube clips that keep no samples,
+are already there. Every run then streams the memory-mapped shards through
+the model in large batches, with no audio decode or STFT, and bulk-updates
+emotion, model_version and the similarity embedding in audio_clips. The
+daily emotion rollups are adjusted for every clip whose label changed.
+
+Clips labeled by their owner (emotion_source "user") keep their emotion and
+only get a fresh embedding; model labels and the "neutral" fallback stored
+when prediction failed are relabeled. Clips from before emotion_source was
+recorded are judged by model_version (see needs_relabel), and clips from
+before model versions were recorded are relabeled only with --relabel-legacy.
+
+    python rescore_clips.py                                          # active model
+    python rescore_clips.py --checkpoint new_model.pth --version 2024-06-01
+    python rescore_clips.py --user-id <id> --dry-run
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", help="Checkpoint to score with (default: the active MODEL_PATH model)")
+    parser.add_argument("--version", help="Version label stored as model_version (default: from the checkpoint)")
+    parser.add_argument("--user-id", help="Only rescore this user's clips")
+    parser.add_argument("--cache-dir", help="Feature cache directory (default: FEATURE_CACHE_DIR)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Clips per forward pass and bulk write")
+    parser.add_argument("--shard-size", type=int, default=1024, help="Clips per new feature shard")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Threads computing missing features")
+    parser.add_argument("--relabel-legacy", action="store_true",
+                        help="Also relabel clips saved before model_version was recorded")
+    parser.add_argument("--dry-run", action="store_true", help="Score and report, but don't update audio_clips")
+    parser.add_argument("--rebuild-stats", action="store_true",
+                        help="Rebuild emotion rollups from scratch afterwards instead of adjusting them per clip")
+    parser.add_argument("--progress-every", type=float, default=5.0, help="Seconds between progress lines")
+    return parser.parse_args()
+
+class Progress:
+    def __init__(self, phase: str, total: int, every: float):
+        self.phase = phase
+        self.total = total
+        self.every = every
+        self.done = 0
+        self.start = self.last = time.perf_counter()
+
+    def add(self, n: int):
+        self.done += n
+        now = time.perf_counter()
+        if now - self.last >= self.every:
+            self.last = now
+            print(f"  {self.phase}: {self.done}/{self.total} clips  {self.rate():.0f} clips/sec", file=sys.stderr)
+
+    def rate(self) -> float:
+        return self.done / max(time.perf_counter() - self.start, 1e-9)
+
+def needs_relabel(doc: dict, relabel_legacy: bool) -> bool:
+    source = doc.get("emotion_source")
+    if source is not None:
+        return source != "user"
+    if "model_version" not in doc:
+        return relabel_legacy
+    if doc["model_version"] is not None:
+        return True
+    # Saved before emotion_source was recorded: YouTube clips are never
+    # labeled by hand, and a clip without an embedding whose label is
+    # "neutral" got the fallback because prediction failed
+    return (doc.get("youtube_url") is not None
+            or (doc.get("embedding_version") is None and doc.get("emotion") == "neutral"))
+
+async def load_targets(collection, user_id, relabel_legacy: bool) -> dict:
+    """clip id -> (relabel?, current emotion, user_id, created_at) for every clip in scope."""
+    query = {"user_id": user_id} if user_id else {}
+    targets = {}
+    projection = {"_id": 1, "emotion": 1, "model_version": 1, "emotion_source": 1, "embedding_version": 1,
+                  "youtube_url": 1, "user_id": 1, "created_at": 1}
+    cursor = collection.find(query, projection).batch_size(5000)
+    async for doc in cursor:
+        relabel = needs_relabel(doc, relabel_legacy)
+        targets[str(doc["_id"])] = (relabel, doc.get("emotion"), doc.get("user_id"), doc.get("created_at"))
+    return targets
+
+async def fill_cache(collection, cache_dir: str, missing: list, args) -> tuple:
+    """Compute and cache features for clips not in the cache yet; returns (cached, skipped)."""
+    import numpy as np
+    from bson import ObjectId
+
+    from core.services.audio_service import clean_audio
+    from core.services.feature_cache import FeatureCacheWriter, write_shard
+    from improved_inference import compute_mel_db, prepare_audio
+
+    def features(audio_data):
+        if not audio_data:
+            return None
+        try:
+            return compute_mel_db(prepare_audio(clean_audio(np.asarray(audio_data, dtype=np.float32))))
+        except Exception:
+            return None
+
+    writer = FeatureCacheWriter(cache_dir, args.shard_size)
+    progress = Progress("features", len(missing), args.progress_every)
+    loop = asyncio.get_running_loop()
+    cached = skipped = 0
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        for i in range(0, len(missing), 256):
+            chunk = [ObjectId(clip_id) for clip_id in missing[i:i + 256]]
+            docs = await collection.find({"_id": {"$in": chunk}}, {"audio_data": 1}).to_list(None)
+            mels = await asyncio.gather(*(loop.run_in_executor(pool, features, doc.get("audio_data")) for doc in docs))
+            for doc, mel in zip(docs, mels):
+                if mel is None:
+                    skipped += 1
+                    continue
+                shard = writer.add(str(doc["_id"]), mel)
+                if shard is not None:
+                    await asyncio.to_thread(write_shard, cache_dir, *shard)
+                cached += 1
+            skipped += len(chunk) - len(docs)  # deleted since load_targets
+            progress.add(len(chunk))
+    writer.flush()
+    if missing:
+        print(f"  features: {cached} cached, {skipped} without usable audio_data "
+              f"({progress.rate():.0f} clips/sec)", file=sys.stderr)
+    return cached, skipped
+
+async def run(args):
+    import numpy as np
+    import torch
+    from bson import ObjectId
+    from pymongo import UpdateOne
+
+    from core.config import settings
+    from core.db.mongo import audio_clips_collection
+    from core.services.feature_cache import cached_ids, iter_shards
+    from core.services.similarity_service import encode_embedding
+    from core.services.stats_service import rebuild_emotion_stats, record_relabels
+    from improved_inference import FEATURE_VERSION, load_model, registry
+
+    cache_dir = args.cache_dir or settings.FEATURE_CACHE_DIR
+    handle = load_model(args.checkpoint, args.version) if args.checkpoint else registry.active
+    print(f"Rescoring with {handle.version} (features {FEATURE_VERSION}, cache {cache_dir})", file=sys.stderr)
+
+    start = time.perf_counter()
+    targets = await load_targets(audio_clips_collection, args.user_id, args.relabel_legacy)
+    cached = cached_ids(cache_dir)
+    missing = [clip_id for clip_id in targets if clip_id not in cached]
+    print(f"{len(targets)} clips in scope, {len(targets) - len(missing)} already in the feature cache",
+          file=sys.stderr)
+    await fill_cache(audio_clips_collection, cache_dir, missing, args)
+
+    def score(mels):
+        batch = torch.from_numpy(np.asarray(mels, dtype=np.float32)).unsqueeze(1)
+        with torch.no_grad():
+            logits, embeddings = handle.model.forward_with_embedding(batch)
+        return logits.argmax(dim=1).tolist(), embeddings.numpy()
+
+    progress = Progress("scoring", len(targets), args.progress_every)
+    seen = set()
+    relabeled = changed = embedded = 0
+    pending_write = None
+    pending_changes = []
+
+    async def finish_write():
+        # Rollups follow the labels only once the batch is really written
+        if pending_write is not None:
+            await pending_write
+            if not args.rebuild_stats:
+                await record_relabels(pending_changes)
+    score_start = time.perf_counter()
+    for shard_ids, shard in iter_shards(cache_dir):
+        rows = [i for i, clip_id in enumerate(shard_ids) if clip_id in targets and clip_id not in seen]
+        for i in range(0, len(rows), args.batch_size):
+            batch_rows = rows[i:i + args.batch_size]
+            labels, embeddings = await asyncio.to_thread(score, shard[batch_rows])
+            ops, changes = [], []
+            for row, label, embedding in zip(batch_rows, labels, embeddings):
+                clip_id = shard_ids[row]
+                seen.add(clip_id)
+                relabel, old_emotion, user_id, created_at = targets[clip_id]
+                update = {"embedding": encode_embedding(embedding), "embedding_version": handle.version}
+                if relabel:
+                    emotion = handle.emotions[label]
+                    update.update(emotion=emotion, model_version=handle.version, emotion_source="model")
+                    relabeled += 1
+                    if emotion != old_emotion:
+                        changed += 1
+                        if created_at is not None:
+                            changes.append((user_id, created_at, old_emotion, emotion))
+                embedded += 1
+                ops.append(UpdateOne({"_id": ObjectId(clip_id)}, {"$set": update}))
+            # Overlap this batch's write with scoring the next one
+            await finish_write()
+            pending_write = None
+            if not args.dry_run:
+                pending_write = asyncio.ensure_future(audio_clips_collection.bulk_write(ops, ordered=False))
+                pending_changes = changes
+            progress.add(len(batch_rows))
+    await finish_write()
+    score_time = time.perf_counter() - score_start
+
+    action = "Would update" if args.dry_run else "Updated"
+    print(f"✅ {action} {embedded} clips in {time.perf_counter() - start:.1f}s "
+          f"(scoring {embedded / max(score_time, 1e-9):.0f} clips/sec): "
+          f"{relabeled} relabeled, {changed} changed emotion, {len(targets) - len(seen)} not scorable")
+
+    if args.rebuild_stats and changed and not args.dry_run:
+        rows = await rebuild_emotion_stats(args.user_id)
+        print(f"✅ Rebuilt {rows} daily rollup rows")
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Exercise the clip write buffer (core/db/write_buffer.py) against the
+in-memory Mongo stand-in: batching, durable acknowledgement, retries after
+transient errors, isolation of bad documents and flushing on shutdown.
+
+    python test_write_buffer.py
+"""
+
+import asyncio
+import sys
+
+from pymongo.errors import AutoReconnect
+
+from core.db.memory import MemoryCollection
+from core.db.write_buffer import BufferedWriter
+
+class FlakyCollection(MemoryCollection):
+    """Fails the first ``failures`` insert_many calls with a transient error."""
+
+    def __init__(self, name: str, failures: int = 0, reject=None):
+        super().__init__(name)
+        self.failures = failures
+        self.reject = reject
+        self.calls = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("connection reset")
+        if self.reject and any(self.reject(d) for d in documents):
+            raise ValueError("document too large")
+        return await super().insert_many(documents, ordered=ordered)
+
+    async def insert_one(self, document):
+        if self.reject and self.reject(document):
+            raise ValueError("document too large")
+        return await super().insert_one(document)
+
+async def check_batching():
+    collection = FlakyCollection("clips")
+    writer = BufferedWriter(collection, max_batch=10, flush_interval=0.05)
+    writer.start()
+    for i in range(25):
+        await writer.insert({"n": i})
+    await asyncio.sleep(0.2)
+    assert await collection.count_documents() == 25
+    assert collection.calls <= 3, collection.calls
+    await asyncio.wait_for(writer.stop(), 2)
+    print(f"✓ Batching: 25 inserts in {collection.calls} insert_many calls")
+
+async def check_durable():
+    collection = FlakyCollection("clips")
+    writer = BufferedWriter(collection, max_batch=100, flush_interval=10)
+    writer.start()
+    ids = await asyncio.wait_for(asyncio.gather(*(writer.insert({"n": i}, durable=True) for i in range(5))), 2)
+    assert all([await collection.find_one({"_id": i}) for i in ids])
+    await asyncio.wait_for(writer.stop(), 2)
+    print("✓ Durable inserts return once written")
+
+async def check_retry():
+    collection = FlakyCollection("clips", failures=2)
+    writer = BufferedWriter(collection, max_batch=10, flush_interval=0.01)
+    writer.start()
+    for i in range(10):
+        await writer.insert({"n": i})
+    await asyncio.sleep(0.2)
+    assert await collection.count_documents() == 10
+    await asyncio.wait_for(writer.stop(), 2)
+    print("✓ Transient errors are retried")
+
+async def check_isolation():
+    collection = FlakyCollection("clips", reject=lambda doc: doc.get("n") == 3)
+    writer = BufferedWriter(collection, max_batch=10, flush_interval=0.01)
+    writer.start()
+    for i in range(9):
+        await writer.insert({"n": i})
+    try:
+        await writer.insert({"n": 3}, durable=True)
+        raise AssertionError("rejected durable insert did not raise")
+    except ValueError:
+        pass
+    await asyncio.wait_for(writer.stop(), 2)
+    assert await collection.count_documents() == 8
+    print("✓ A rejected document fails alone")
+
+async def check_shutdown():
+    # A full batch sets the wake event right before stop()
+    collection = FlakyCollection("clips")
+    writer = BufferedWriter(collection, max_batch=10, flush_interval=10)
+    writer.start()
+    for i in range(10):
+        await writer.insert({"n": i})
+    await asyncio.wait_for(writer.stop(), 2)
+    assert await collection.count_documents() == 10
+    assert writer.stats()["pending"] == 0
+    print("✓ stop() returns and writes everything buffered")
+
+async def main():
+    await check_batching()
+    await check_durable()
+    await check_retry()
+    await check_isolation()
+    await check_shutdown()
+
+def test_write_buffer() -> bool:
+    print("Testing write buffer...")
+    try:
+        asyncio.run(main())
+    except (AssertionError, asyncio.TimeoutError) as e:
+        print(f"❌ Write buffer check failed: {type(e).__name__} {e}")
+        return False
+    print("\n🎉 Write buffer checks passed.")
+    return True
+
+if __name__ == "__main__":
+    sys.exit(0 if test_write_buffer() else 1)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Train the cascade's cheap first stage and report latency vs agreement.
+
+Fits a softmax-linear model on pooled mel/energy/zero-crossing statistics
+(improved_inference.stage1_features). By default the labels are the CNN
+checkpoint's own predictions (distillation), so agreement measures how
+often the cascade returns what the CNN would have. Holds out a test split,
+prints coverage / agreement / average latency per confidence threshold,
+and saves the parameters as a plain .npz that the API loads when
+CASCADE_ENABLED=true.
+
+    python train_cascade.py recordings/ -o cascade_stage1.npz
+    python train_cascade.py manifest.csv --label-column emotion --target-agreement 0.98
+"""
+
+import argparse
+import csv
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bulk_score import collect_files, decode
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98, 0.99]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Directory of audio files or manifest (see bulk_score.py)")
+    parser.add_argument("-o", "--output", default=None, help="Output .npz (default: cascade_stage1.npz in MODEL_DIR)")
+    parser.add_argument("--label-column", help="Use this CSV manifest column as labels instead of CNN predictions")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Decode processes")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Held-out fraction for the report")
+    parser.add_argument("--target-agreement", type=float, default=0.97,
+                        help="Pick the lowest threshold whose agreement with the CNN reaches this")
+    parser.add_argument("--threshold", type=float, help="Use this threshold instead of picking one")
+    parser.add_argument("--C", type=float, default=1.0, help="Inverse regularization strength")
+    parser.add_argument("--version", help="Version label (default: cascade-<hash of weights>)")
+    parser.add_argument("--timing-clips", type=int, default=100, help="Test clips timed one at a time")
+    return parser.parse_args()
+
+def load_labels(manifest: str, column: str) -> dict:
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, newline="") as f:
+        reader = csv.DictReader(f)
+        path_column = "path" if "path" in (reader.fieldnames or []) else "file"
+        return {(row[path_column] if os.path.isabs(row[path_column]) else os.path.join(base, row[path_column])):
+                row[column] for row in reader if row.get(column)}
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from sklearn.linear_model import LogisticRegression
+    import torch
+    import improved_inference as inference
+
+    files = collect_files(args.input)
+    labels_by_file = load_labels(args.input, args.label_column) if args.label_column else None
+    if labels_by_file is not None:
+        files = [path for path in files if path in labels_by_file]
+    print(f"Decoding {len(files)} files...", file=sys.stderr)
+
+    clips, kept = [], []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(decode, path, inference.DURATION) for path in files]
+        for path, future in zip(files, futures):
+            try:
+                clips.append(inference.prepare_audio(future.result()[0]))
+                kept.append(path)
+            except Exception as e:
+                print(f"  skipping {path}: {e}", file=sys.stderr)
+    if len(clips) < 10:
+        raise SystemExit("Need at least 10 decodable clips to train the cascade")
+
+    print("Computing features and CNN labels...", file=sys.stderr)
+    mels = [inference.compute_mel_db(audio) for audio in clips]
+    features = np.stack([inference.stage1_features(audio, mel) for audio, mel in zip(clips, mels)])
+    cnn_labels = []
+    for i in range(0, len(mels), 64):
+        batch = torch.from_numpy(np.stack(mels[i:i + 64])).float().unsqueeze(1)
+        probs, handle = inference.registry.predict_mels(batch)
+        cnn_labels += [handle.emotions[int(p.argmax())] for p in probs]
+    cnn_labels = np.array(cnn_labels)
+    targets = np.array([labels_by_file[path] for path in kept]) if labels_by_file else cnn_labels
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(clips))
+    n_test = max(1, int(len(clips) * args.test_fraction))
+    test, train = order[:n_test], order[n_test:]
+
+    mean = features[train].mean(axis=0)
+    scale = features[train].std(axis=0) + 1e-6
+    clf = LogisticRegression(C=args.C, max_iter=2000)
+    clf.fit((features[train] - mean) / scale, targets[train])
+
+    weights = clf.coef_.astype(np.float32)
+    bias = clf.intercept_.astype(np.float32)
+    if weights.shape[0] == 1:
+        # Binary problems come back as a single row; expand to two softmax rows
+        weights = np.vstack([-weights / 2, weights / 2])
+        bias = np.array([-bias[0] / 2, bias[0] / 2], dtype=np.float32)
+    version = args.version or "cascade-" + hashlib.sha256(weights.tobytes() + bias.tobytes()).hexdigest()[:8]
+
+    output = args.output or os.path.join(inference.MODEL_DIR, "cascade_stage1.npz")
+    params = dict(mean=mean.astype(np.float32), scale=scale.astype(np.float32), weights=weights, bias=bias,
+                  classes=np.array([str(c) for c in clf.classes_]), version=np.array(version), threshold=np.array(0.9))
+    np.savez(output, **params)
+    stage1 = inference.CascadeClassifier(output)
+
+    # Coverage / agreement per threshold on the held-out split
+    test_probs = stage1.predict_proba(features[test])
+    stage1_labels = np.array([stage1.classes[i] for i in test_probs.argmax(axis=1)])
+    confidence = test_probs.max(axis=1)
+
+    # Per-clip latency of each stage, timed one clip at a time like a request
+    timed = test[:args.timing_clips]
+    t_mel = t_stage1 = t_cnn = 0.0
+    for i in timed:
+        start = time.perf_counter()
+        mel = inference.compute_mel_db(clips[i])
+        t_mel += time.perf_counter() - start
+        start = time.perf_counter()
+        stage1.predict_proba(inference.stage1_features(clips[i], mel)[None, :])
+        t_stage1 += time.perf_counter() - start
+        start = time.perf_counter()
+        inference.registry.predict_mels(torch.from_numpy(mel).float()[None, None])
+        t_cnn += time.perf_counter() - start
+    t_mel, t_stage1, t_cnn = (1000 * t / len(timed) for t in (t_mel, t_stage1, t_cnn))
+
+    print(f"\nTrained on {len(train)} clips, evaluated on {len(test)} "
+          f"(stage-1 train accuracy {clf.score((features[train] - mean) / scale, targets[train]):.3f})")
+    print(f"Per clip: mel {t_mel:.1f} ms, stage 1 {t_stage1:.2f} ms, CNN {t_cnn:.1f} ms "
+          f"-> CNN only {t_mel + t_cnn:.1f} ms\n")
+    header = f"{'threshold':>9} {'coverage':>9} {'agree w/ CNN':>13} {'avg ms':>8} {'speedup':>8}"
+    if labels_by_file:
+        header += f" {'accuracy':>9}"
+    print(header)
+
+    chosen = args.threshold
+    for threshold in THRESHOLDS:
+        answered = confidence >= threshold
+        final = np.where(answered, stage1_labels, cnn_labels[test])
+        agreement = float(np.mean(final == cnn_labels[test]))
+        latency = t_mel + t_stage1 + (1 - answered.mean()) * t_cnn
+        row = (f"{threshold:>9.2f} {answered.mean():>9.1%} {agreement:>13.1%} {latency:>8.1f} "
+               f"{(t_mel + t_cnn) / latency:>7.2f}x")
+        if labels_by_file:
+            row += f" {np.mean(final == targets[test]):>9.1%}"
+        print(row)
+        if chosen is None and agreement >= args.target_agreement:
+            chosen = threshold
+    if chosen is None:
+        chosen = THRESHOLDS[-1]
+
+    params["threshold"] = np.array(chosen)
+    np.savez(output, **params)
+    print(f"\n✅ Saved {version} to {output} with threshold {chosen}")
+    print("Enable with CASCADE_ENABLED=true (override the threshold with CASCADE_THRESHOLD)")
+
+if __name__ == "__main__":
+    main()